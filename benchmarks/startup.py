@@ -0,0 +1,58 @@
+"""Time a cold import of the model package in fresh interpreters.
+
+python benchmarks/startup.py [repeats]
+
+Compares the headless core against the Mesa model and the old baseline of
+importing the server, and lists which heavy packages each import loads.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = {
+    'headless core': 'import virus_on_network.core',
+    'sweep runner': 'import virus_on_network.sweep',
+    'mesa model': 'import virus_on_network.model',
+    'server': 'import virus_on_network.server',
+}
+
+HEAVY = ('mesa', 'tornado', 'pandas', 'networkx', 'scipy')
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def time_import(statement, repeats):
+    times = []
+    loaded = ''
+    for _ in range(repeats):
+        # the timing is the last line, the server prints while importing, and
+        # the model it builds logs to the working directory
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run(
+                [sys.executable, '-c', SCRIPT.format(statement=statement, heavy=HEAVY)],
+                cwd=cwd, env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True,
+                check=True).stdout.splitlines()[-1].split()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ''
+    return times, loaded
+
+
+def main(repeats=5):
+    print(f"{'import':<15} {'median ms':>10} {'min ms':>8}  heavy packages loaded")
+    for name, statement in IMPORTS.items():
+        times, loaded = time_import(statement, repeats)
+        print(f"{name:<15} {statistics.median(times) * 1e3:>10.1f} {min(times) * 1e3:>8.1f}  {loaded or '-'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
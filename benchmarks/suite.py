@@ -0,0 +1,190 @@
+"""Benchmarks of graph build, model setup, stepping and portrayal.
+
+python benchmarks/suite.py [--max-nodes N] [--output results.json]
+python benchmarks/suite.py --compare old.json new.json
+
+Every case (engine, number of nodes) runs in a fresh interpreter with a
+fixed seed, so the peak RSS it reports is its own. Results are written as
+JSON together with the commit they were measured on, --compare prints the
+ratio new / old of every timing of two such files.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCALES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+# the agent engine and the networkx portrayal do not get further in useful time
+AGENTS_MAX_NODES = 10 ** 4
+PORTRAYAL_MAX_NODES = 10 ** 4
+DELTA_PORTRAYAL_MAX_NODES = 10 ** 5
+
+PARAMS = {
+    'j': 2,
+    'avg_node_degree': 3,
+    'virus_0_check_frequency': 0.4,
+    'virus_1_check_frequency': 0.4,
+    'virus_0_spread_chance': 0.4,
+    'virus_1_spread_chance': 0.4,
+}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(engine, num_nodes, steps, seed):
+    """Time one case in this process, returns its result row"""
+    import numpy as np
+    from virus_on_network.graph import erdos_renyi_graph
+    from virus_on_network.output import NullSink
+    if engine == 'agents':
+        from virus_on_network.model import VirusOnNetwork
+    else:
+        from virus_on_network.core import HeadlessVirusOnNetwork as VirusOnNetwork
+
+    row = {'engine': engine, 'num_nodes': num_nodes, 'steps': steps, 'seed': seed}
+    graph, row['graph_build_seconds'] = timed(
+        erdos_renyi_graph, num_nodes, PARAMS['avg_node_degree'] / num_nodes, np.random.default_rng(seed))
+    row['num_edges'] = graph.num_edges
+    # with the graph given, construction is the state setup and the seeding
+    _, row['setup_seconds'] = timed(
+        VirusOnNetwork, engine=engine, output=NullSink(), graph=graph, seed=seed, **PARAMS)
+    model, row['init_seconds'] = timed(
+        VirusOnNetwork, num_nodes=num_nodes, engine=engine, output=NullSink(), seed=seed, **PARAMS)
+
+    step_times = []
+    for _ in range(steps):
+        step_times.append(timed(model.step)[1])
+    row['step_seconds_median'] = statistics.median(step_times)
+    row['step_seconds_total'] = sum(step_times)
+    row['infected'] = [len(model.infected_nodes(i)) for i in range(PARAMS['j'])]
+
+    if engine == 'agents' and num_nodes <= PORTRAYAL_MAX_NODES:
+        from virus_on_network.server import network_portrayal
+        portrayal, row['portrayal_seconds'] = timed(network_portrayal, model.G)
+        text, row['portrayal_json_seconds'] = timed(json.dumps, portrayal)
+        row['portrayal_bytes'] = len(text)
+
+    if num_nodes <= DELTA_PORTRAYAL_MAX_NODES:
+        # first frame of the server's network view, then one step of changes
+        from virus_on_network.network_module import DeltaNetworkModule
+        module = DeltaNetworkModule()
+        frame, row['delta_full_seconds'] = timed(module.render, model)
+        row['delta_full_bytes'] = len(json.dumps(frame))
+        model.step()
+        frame, row['delta_step_seconds'] = timed(module.render, model)
+        text, row['delta_step_json_seconds'] = timed(json.dumps, frame)
+        row['delta_step_bytes'] = len(text)
+
+    row['peak_rss_mb'] = peak_rss_mb()
+    return row
+
+
+def cases(max_nodes, engines):
+    for num_nodes in SCALES:
+        if num_nodes > max_nodes:
+            break
+        for engine in engines:
+            if engine == 'agents' and num_nodes > AGENTS_MAX_NODES:
+                continue
+            yield engine, num_nodes
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(max_nodes, engines, steps, seed, progress=print):
+    import numpy as np
+    results = {
+        'commit': commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cases': [],
+    }
+    for engine, num_nodes in cases(max_nodes, engines):
+        # importing the server builds a model that logs to the working directory
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--case', engine, str(num_nodes),
+                 '--steps', str(steps), '--seed', str(seed)],
+                cwd=cwd, capture_output=True, text=True, check=True).stdout
+        # the row is the last line, anything else was printed by the model
+        row = json.loads(out.splitlines()[-1])
+        results['cases'].append(row)
+        if progress:
+            progress(f"{engine:>10} {num_nodes:>8} nodes  init {row['init_seconds']:.3f}s  "
+                     f"step {row['step_seconds_median'] * 1e3:.2f}ms  peak {row['peak_rss_mb']:.0f}MB")
+    return results
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}, new / old, below 1 is faster")
+    old_rows = {(row['engine'], row['num_nodes']): row for row in old['cases']}
+    for row in new['cases']:
+        before = old_rows.get((row['engine'], row['num_nodes']))
+        if before is None:
+            continue
+        ratios = [
+            f"{key.replace('_seconds', '')} {row[key] / before[key]:.2f}"
+            for key in row
+            if (key.endswith('seconds') or key.endswith('_median') or key == 'peak_rss_mb')
+            and before.get(key)
+        ]
+        print(f"{row['engine']:>10} {row['num_nodes']:>8}  " + '  '.join(ratios))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-nodes', type=int, default=SCALES[-1])
+    parser.add_argument('--engines', default='agents,vectorized,events')
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file, default benchmarks/results/<commit>.json")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--case', nargs=2, metavar=('ENGINE', 'NODES'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.steps, args.seed)))
+    else:
+        results = run_suite(args.max_nodes, args.engines.split(','), args.steps, args.seed)
+        output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{results['commit'] or 'local'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,55 +1,64 @@
-from virus_on_network.server import server
 import sys
 import socketserver
 
-for i in range(8521, 8524):
-    try:
-        server.launch(i)
-        port = i
-    except:
-        print(i, " is occupied")
+def launch():
+    # the server pulls in the whole Mesa visualization, only load it when asked
+    from virus_on_network.server import server
+    for i in range(8521, 8524):
+        try:
+            server.launch(i)
+            port = i
+        except:
+            print(i, " is occupied")
 
 
 
 
 ### START OF CODE FOR BATCH RUNNER
+# python run.py sweep runs the parameter sweep below instead of the server
 
-from virus_on_network.model import *
-from virus_on_network.server import *
+from virus_on_network.sweep import parameter_grid, run_sweep
 from numpy import arange
 #import matplotlib.pyplot as plt
-from mesa.batchrunner import BatchRunner
-'''
-fixed_params = {
 
-    "virus_check_frequency": 0.4,
+fixed_params = {
+    "j": 2,
     "avg_node_degree": 3,
-    "initial_outbreak_size": 1,
-    "exposed_chance": 0.3,
-    #recovery_chance=0.3,
-    "gain_skeptical_chance": 0.5,
-    "skeptical_level": 0.2,
+    "initial_outbreak_size_virus_0": 1,
+    "initial_outbreak_size_virus_1": 1,
+    "virus_0_check_frequency": 0.4,
+    "virus_1_check_frequency": 0.4,
+    "exposed_chance_virus_0": 0.3,
+    "exposed_chance_virus_1": 0.3,
+    "gain_skeptical_chance_virus_0": 0.5,
+    "gain_skeptical_chance_virus_1": 0.5,
+    "engine": "vectorized",
 }
 
 variable_params = {
     "num_nodes": range(90, 100, 5),
-    "virus_spread_chance": arange(0.0, 1.1, .5)
+    "virus_0_spread_chance": arange(0.0, 1.1, .5),
+    "virus_1_spread_chance": arange(0.0, 1.1, .5),
 }
 
 num_iterations = 5
-num_steps = 1
-
-batch_run = BatchRunner(VirusOnNetwork,
-                        fixed_parameters=fixed_params,
-                        variable_parameters=variable_params,
-                        iterations=num_iterations,
-                        max_steps=num_steps,
-                        model_reporters=
-                        {
-                            #some form of csv file writer perhaps?...
-                        }
-)
-
-batch_run.run_all()'''
+num_steps = 10
+
+
+def batch_run():
+    return run_sweep(
+        parameter_grid(fixed_params, variable_params),
+        replicates=num_iterations,
+        steps=num_steps,
+        output_root="sweep_output",
+    )
+
 #pid = process.pid
 #kill(pid, signal.SIGKILL)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["sweep"]:
+        print(batch_run())
+    else:
+        launch()
@@ -1,34 +1,23 @@
-import pandas as pd
-import csv
+import argparse
 
+from virus_on_network.spreaders import analyze_runs, write_table
 
-df = pd.read_csv('infected_by.csv', delimiter=',')
 
-with open('infection_spreaders.csv', 'w') as s:
-    
-    values = df.iloc[:, 2].value_counts()
-    print(values)
-    s.write('node, number of other nodes infected by node\n')
-    s.write(str(values))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count how many nodes every node infected")
+    parser.add_argument('runs', nargs='*', default=['.'], help="run directories holding infected_by.csv")
+    parser.add_argument('--top', type=int, default=10, help="super spreaders to list per virus")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--chunksize', type=int, default=1 << 20, help="log rows read at a time")
+    args = parser.parse_args(argv)
 
-    values = df.iloc[:, 6].value_counts()
-    print(values)
-    s.write('node, number of other nodes infected by node\n')
-    s.write(str(values))
-
-    values = df.iloc[:, 10].value_counts()
-    print(values)
-    s.write('node, number of other nodes infected by node\n')
-    s.write(str(values))
-
-    values = df.iloc[:, 14].value_counts()
-    print(values)
-    s.write('node, number of other nodes infected by node\n')
-    s.write(str(values))
-    
-    values = df.iloc[:, 18].value_counts()
-    print(values)
-    s.write('node, number of other nodes infected by node\n')
-    s.write(str(values))
+    nodes, top, summary = analyze_runs(args.runs, args.top, args.chunksize)
+    write_table(nodes, f'infection_spreaders.{args.format}')
+    write_table(top, f'top_spreaders.{args.format}')
+    write_table(summary, f'spreader_summary.{args.format}')
+    print(top.to_string(index=False))
+    print(summary.to_string(index=False))
 
 
+if __name__ == '__main__':
+    main()
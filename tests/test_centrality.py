@@ -0,0 +1,14 @@
+from virus_on_network.core import HeadlessVirusOnNetwork
+from virus_on_network.output import MemorySink, NullSink
+
+
+def test_background_centrality_only_starts_when_written(tmp_path):
+    model = HeadlessVirusOnNetwork(num_nodes=30, centrality="background", centrality_cache=str(tmp_path),
+                                   output=NullSink(), seed=1)
+    assert not model.centrality_pending
+    assert model.centrality._future is None
+
+    model = HeadlessVirusOnNetwork(num_nodes=30, centrality="background", centrality_cache=str(tmp_path),
+                                   output=MemorySink(), seed=1)
+    model.run_model(1)
+    assert not model.centrality_pending
@@ -0,0 +1,36 @@
+import functools
+
+import numpy as np
+
+from virus_on_network.model import VirusOnNetwork
+from virus_on_network.output import NullSink
+
+PARAMS = dict(num_nodes=200, avg_node_degree=4, j=2,
+              initial_outbreak_size_virus_0=2, initial_outbreak_size_virus_1=2,
+              virus_0_spread_chance=.8, virus_1_spread_chance=.8,
+              virus_0_check_frequency=.6, virus_1_check_frequency=.6)
+RUNS = 80
+STEPS = 6
+# the events engine falls a little behind in later steps, see EventEngine
+TOLERANCE = .10
+
+
+@functools.lru_cache()
+def trajectories(engine):
+    sizes = []
+    for seed in range(RUNS):
+        model = VirusOnNetwork(engine=engine, seed=seed, output=NullSink(), **PARAMS)
+        row = []
+        for _ in range(STEPS):
+            model.step()
+            row.append(sum(len(model.infected_nodes(i)) for i in range(2)))
+        sizes.append(row)
+    return np.array(sizes, dtype=float)
+
+
+def test_events_trajectory_matches_agents():
+    agents = trajectories("agents")
+    events = trajectories("events")
+    error = np.sqrt(agents.var(axis=0, ddof=1) / RUNS + events.var(axis=0, ddof=1) / RUNS)
+    difference = np.abs(agents.mean(axis=0) - events.mean(axis=0))
+    assert (difference < TOLERANCE * agents.mean(axis=0) + 2 * error).all()
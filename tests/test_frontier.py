@@ -0,0 +1,27 @@
+import numpy as np
+
+from virus_on_network.model import VirusOnNetwork
+from virus_on_network.output import NullSink
+
+PARAMS = dict(num_nodes=150, avg_node_degree=4, j=2, engine='agents',
+              virus_0_spread_chance=1, virus_1_spread_chance=1,
+              virus_0_check_frequency=.8, virus_1_check_frequency=.8)
+RUNS = 60
+STEPS = 6
+
+
+def final_infected(activation):
+    sizes = []
+    for seed in range(RUNS):
+        model = VirusOnNetwork(activation=activation, seed=seed, output=NullSink(), **PARAMS)
+        for _ in range(STEPS):
+            model.step()
+        sizes.append(sum(len(model.infected_nodes(i)) for i in range(2)))
+    return np.array(sizes, dtype=float)
+
+
+def test_frontier_matches_random_activation():
+    random_sizes = final_infected("random")
+    frontier_sizes = final_infected("frontier")
+    error = np.sqrt(random_sizes.var(ddof=1) / RUNS + frontier_sizes.var(ddof=1) / RUNS)
+    assert abs(random_sizes.mean() - frontier_sizes.mean()) < 3 * error
@@ -0,0 +1,39 @@
+import numpy as np
+
+from virus_on_network.core import HeadlessVirusOnNetwork
+from virus_on_network.graph_cache import GraphCache
+from virus_on_network.output import NullSink
+from virus_on_network.sweep import run_sweep
+
+PARAMS = dict(num_nodes=300, avg_node_degree=6, j=2, engine='vectorized')
+
+
+def results(df):
+    return df.drop(columns='seconds').sort_values('run').reset_index(drop=True)
+
+
+def test_cached_graph_is_the_models_graph(tmp_path):
+    model = HeadlessVirusOnNetwork(seed=5, output=NullSink(), **PARAMS)
+    cached = GraphCache(str(tmp_path)).get(300, 6, 5)
+    assert cached.num_edges == model.network.num_edges
+    np.testing.assert_array_equal(cached.indptr, model.network.indptr)
+    np.testing.assert_array_equal(cached.indices, model.network.indices)
+    np.testing.assert_array_equal(cached.weights, model.network.weights)
+
+
+def test_cached_edgelist_is_the_models_graph(tmp_path):
+    path = tmp_path / 'edges.txt'
+    path.write_text("1 2\n2 3\n3 4\n4 1\n1 3\n")
+    model = HeadlessVirusOnNetwork(seed=5, output=NullSink(), edgelist=str(path), j=1)
+    cached, labels = GraphCache(str(tmp_path / 'cache')).get_edgelist(str(path), 5)
+    np.testing.assert_array_equal(labels, model.node_labels)
+    np.testing.assert_array_equal(cached.indices, model.network.indices)
+    np.testing.assert_array_equal(cached.weights, model.network.weights)
+
+
+def test_sweep_with_cache_matches_sweep_without(tmp_path):
+    param_sets = [dict(PARAMS, virus_0_spread_chance=.5), dict(PARAMS, virus_0_spread_chance=1)]
+    kwargs = dict(replicates=2, steps=5, processes=1, seed=3, progress=lambda *args: None)
+    uncached = run_sweep(param_sets, **kwargs)
+    cached = run_sweep(param_sets, graph_cache=str(tmp_path), **kwargs)
+    assert results(cached).equals(results(uncached))
@@ -0,0 +1,47 @@
+from virus_on_network.core import HeadlessVirusOnNetwork
+from virus_on_network.network_module import DeltaNetworkModule
+from virus_on_network.output import NullSink
+
+
+class Client:
+    pass
+
+
+def model(seed, num_nodes=60):
+    return HeadlessVirusOnNetwork(num_nodes=num_nodes, j=2, engine='vectorized', seed=seed, output=NullSink())
+
+
+def test_every_client_gets_a_full_frame_of_the_current_model():
+    module = DeltaNetworkModule(max_nodes=100)
+    first, second = Client(), Client()
+    old = model(0)
+    assert module.render(old, first)['type'] == 'full'
+    assert module.render(old, first)['type'] == 'delta'
+    # a second tab resets the model, the first one has not drawn the new topology
+    new = model(1)
+    assert module.render(new, second)['type'] == 'full'
+    assert module.render(new, second)['type'] == 'delta'
+    assert module.render(new, first)['type'] == 'full'
+
+
+def test_deltas_are_against_the_clients_last_frame():
+    module = DeltaNetworkModule(max_nodes=100)
+    first, second = Client(), Client()
+    m = model(2)
+    module.render(m, first)
+    module.render(m, second)
+    for _ in range(3):
+        m.step()
+    module.render(m, second)
+    # the first client still needs every change since its last frame
+    assert module.render(m, first)['nodes']
+    assert not module.render(m, second)['nodes']
+
+
+def test_supernodes_are_per_client_too():
+    module = DeltaNetworkModule(max_nodes=20)
+    first, second = Client(), Client()
+    m = model(3, num_nodes=200)
+    assert module.render(m, first)['type'] == 'full'
+    assert module.render(m, second)['type'] == 'full'
+    assert module.render(m, first)['type'] == 'delta'
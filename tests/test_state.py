@@ -0,0 +1,21 @@
+import numpy as np
+
+from virus_on_network.state import EXPOSED, INFECTED, SUSCEPTIBLE, State, VirusState
+
+
+def test_compartments_follow_codes():
+    state = VirusState(2, 10)
+    state.set_codes(0, np.array([1, 2, 3]), State.EXPOSED)
+    state.set_code(0, 2, State.INFECTED)
+    state.set_code(1, 4, State.INFECTED | State.EXPOSED)
+    state.set_code(0, 3, State.SUSCEPTIBLE)
+    assert state.compartments[0][SUSCEPTIBLE] is None
+    assert state.exposed_nodes(0) == [1]
+    assert state.infected_nodes(0) == [2]
+    assert state.infected_nodes(1) == [4]
+    assert state.not_infected_or_exposed_nodes(0) == [0, 3, 4, 5, 6, 7, 8, 9]
+
+    loaded = VirusState(2, 10)
+    loaded.load(state.codes, state.skeptical_level)
+    assert loaded.compartments[0][EXPOSED] == {1}
+    assert loaded.compartments[1][INFECTED] == {4}
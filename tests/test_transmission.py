@@ -0,0 +1,30 @@
+import numpy as np
+
+from virus_on_network.output import MemorySink
+from virus_on_network.transmission import LOG_NAME, TransmissionLog
+
+
+def test_spilled_events_leave_memory():
+    sink = MemorySink()
+    log = TransmissionLog(sink, capacity=4)
+    for step in range(1, 51):
+        log.record_many(step, np.array([step, step]), np.array([step + 1, step + 2]), 0)
+        log.spill()
+        assert log.pending == 0
+    # memory holds one step of events, however long the run
+    assert len(log.buffer) == 4
+    assert len(log) == 100
+    assert log.history(10)['source'].tolist() == [8, 9]
+    assert log.infections_by(10)['target'].tolist() == [11, 12]
+    assert sink.getvalue(LOG_NAME).count('\n') == 101
+
+
+def test_load_keeps_every_event():
+    log = TransmissionLog()
+    log.record(0, -1, 3, 1)
+    log.spill()
+    log.record(1, 3, 4, 1)
+    copy = TransmissionLog()
+    copy.load(log.events)
+    assert (copy.events == log.events).all()
+    assert copy.history(4)['source'].tolist() == [3]
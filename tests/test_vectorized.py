@@ -0,0 +1,39 @@
+import functools
+
+import numpy as np
+
+from virus_on_network.ensemble import Ensemble
+from virus_on_network.model import VirusOnNetwork
+from virus_on_network.output import NullSink
+
+PARAMS = dict(num_nodes=200, avg_node_degree=4, j=2,
+              initial_outbreak_size_virus_0=2, initial_outbreak_size_virus_1=2,
+              virus_0_spread_chance=.8, virus_1_spread_chance=.8,
+              virus_0_check_frequency=.6, virus_1_check_frequency=.6)
+RUNS = 80
+STEPS = 6
+
+
+@functools.lru_cache()
+def final_infected(engine):
+    sizes = []
+    for seed in range(RUNS):
+        model = VirusOnNetwork(engine=engine, seed=seed, output=NullSink(), **PARAMS)
+        for _ in range(STEPS):
+            model.step()
+        sizes.append(sum(len(model.infected_nodes(i)) for i in range(2)))
+    return np.array(sizes, dtype=float)
+
+
+def assert_same_mean(a, b):
+    error = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    assert abs(a.mean() - b.mean()) < 3 * error
+
+
+def test_vectorized_matches_agents():
+    assert_same_mean(final_infected("agents"), final_infected("vectorized"))
+
+
+def test_ensemble_matches_agents():
+    ensemble = Ensemble(RUNS, seed=0, **PARAMS).run(STEPS)
+    assert_same_mean(final_infected("agents"), ensemble.final_sizes().sum(axis=1).astype(float))
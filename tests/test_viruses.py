@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from virus_on_network.model import VirusOnNetwork
+from virus_on_network.output import NullSink
+from virus_on_network.state import AgentMisinformation
+
+
+def model(engine='agents', **params):
+    return VirusOnNetwork(num_nodes=60, avg_node_degree=4, j=3, engine=engine, seed=2, output=NullSink(), **params)
+
+
+def test_misinformation_is_a_read_only_view_of_viruses():
+    m = model(virus_1_spread_chance=.3)
+    assert m.misinformation[1]['spread_chance'] == .3
+    with pytest.raises(TypeError):
+        m.misinformation[1]['spread_chance'] = 1
+    m.viruses.spread_chance[1] = .7
+    assert m.misinformation[1]['spread_chance'] == .7
+
+
+def test_old_keys_come_from_the_suppression_matrix():
+    m = model()
+    assert m.misinformation[0]['num_virus'] == 3
+    assert [m.misinformation[i]['opposite_virus'] for i in range(3)] == [1, 0, None]
+    view = AgentMisinformation(m, 0)
+    assert view[1]['opposite_virus'] == 0
+    assert view[0]['num_virus'] == 3
+
+
+@pytest.mark.parametrize('engine', ['agents', 'vectorized', 'events'])
+def test_every_engine_reads_the_parameter_arrays(engine):
+    m = model(engine)
+    seeded = len(m.transmissions)
+    # without checks nobody can infect
+    m.viruses.virus_check_frequency[:] = 0
+    m.run_model(5)
+    assert len(m.transmissions) == seeded
+    assert np.all(m.state.skeptical_level <= 1)
@@ -0,0 +1,162 @@
+import os
+import threading
+
+import tornado.escape
+import tornado.ioloop
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, VisualizationElement
+from tornado.routing import PathMatches, Rule
+
+
+class ModelRunner:
+    """Steps a model in a background thread.
+
+    run() steps it as fast as it goes until pause(), advance(n) steps it n
+    times and then calls done. Every step holds lock, so whoever renders the
+    model takes the same lock and always sees a finished step.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.RLock()
+        self.free_running = False
+        self.remaining = 0
+        self.done = None
+        self.stopped = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        return self.free_running or self.remaining > 0
+
+    def run(self):
+        self.free_running = True
+        self._wake.set()
+
+    def pause(self):
+        self.free_running = False
+        self.remaining = 0
+
+    def advance(self, steps, done=None):
+        self.remaining += steps
+        self.done = done
+        self._wake.set()
+
+    def stop(self):
+        self.stopped = True
+        self.pause()
+        self._wake.set()
+
+    def _loop(self):
+        while not self.stopped:
+            self._wake.wait()
+            self._wake.clear()
+            while self.busy and not self.stopped and self.model.running:
+                with self.lock:
+                    self.model.step()
+                if self.remaining > 0:
+                    self.remaining -= 1
+                    if self.remaining == 0:
+                        self._finish()
+            if not self.model.running:
+                self.pause()
+                self._finish()
+
+    def _finish(self):
+        done, self.done = self.done, None
+        if done:
+            done()
+
+
+class BackgroundSocketHandler(SocketHandler):
+    """SocketHandler that samples the model instead of stepping it while it runs.
+
+    get_step steps once like before unless the runner is busy, then it only
+    renders the latest step. {"type": "run"} and {"type": "pause"} start and
+    stop free running, {"type": "advance", "steps": n} steps n times and
+    renders once at the end. Frames are rendered for this connection, see
+    BackgroundServer.render_model.
+    """
+
+    def open(self):
+        self.loop = tornado.ioloop.IOLoop.current()
+        super().open()
+
+    def on_close(self):
+        for element in self.application.visualization_elements:
+            if getattr(element, 'per_client', False):
+                element.forget(self)
+
+    @property
+    def viz_state_message(self):
+        return {"type": "viz_state", "data": self.application.render_model(self)}
+
+    def send_state(self):
+        # called from the runner thread, the socket belongs to the IOLoop
+        def write():
+            if not self.application.model.running:
+                self.write_message({"type": "end"})
+            self.write_message(self.viz_state_message)
+        self.loop.add_callback(write)
+
+    def on_message(self, message):
+        msg = tornado.escape.json_decode(message)
+        runner = self.application.runner
+        if msg["type"] == "get_step" and runner.busy:
+            self.write_message(self.viz_state_message)
+        elif msg["type"] == "get_step":
+            with runner.lock:
+                super().on_message(message)
+        elif msg["type"] == "run":
+            runner.run()
+        elif msg["type"] == "pause":
+            runner.pause()
+            self.write_message(self.viz_state_message)
+        elif msg["type"] == "advance":
+            runner.advance(int(msg.get("steps", 1)), self.send_state)
+        else:
+            super().on_message(message)
+
+
+class BackgroundControls(VisualizationElement):
+    """Run, pause and advance N buttons, and the step the model is really at"""
+
+    local_includes = ["BackgroundControls.js"]
+    local_dir = os.path.join(os.path.dirname(__file__), "js")
+    js_code = "elements.push(new BackgroundControls());"
+
+    def render(self, model):
+        return {"step": model.step_number}
+
+
+class BackgroundServer(ModularServer):
+    """ModularServer whose model steps in a ModelRunner thread.
+
+    The browser renders at its own frame rate and each frame shows the
+    latest finished step, however many steps ran since the last one.
+    Include a BackgroundControls element to get the buttons.
+    """
+
+    runner = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # mesa routes /ws to its own handler, ours goes first
+        self.wildcard_router.rules.insert(0, Rule(PathMatches(r"/ws"), BackgroundSocketHandler))
+
+    def reset_model(self):
+        if self.runner is not None:
+            self.runner.stop()
+            with self.runner.lock:
+                super().reset_model()
+        else:
+            super().reset_model()
+        self.runner = ModelRunner(self.model)
+
+    def render_model(self, client=None):
+        # elements with per_client set render for the connection that asks,
+        # e.g. DeltaNetworkModule sends deltas against that tab's last frame
+        with self.runner.lock:
+            return [element.render(self.model, client) if getattr(element, 'per_client', False)
+                    else element.render(self.model) for element in self.visualization_elements]
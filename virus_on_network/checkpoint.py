@@ -0,0 +1,108 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from .graph import CSRGraph
+
+GRAPH_ARRAYS = ('indptr', 'indices', 'weights')
+STATE_ARRAYS = ('codes', 'skeptical_level', 'transmissions')
+META = 'checkpoint.pickle'
+
+
+def engine_of(model):
+    # the object stepping the model, agents keep their state on the model
+    return {'vectorized': getattr(model, 'vectorized', None),
+            'events': getattr(model, 'events', None)}.get(model.engine)
+
+
+class Checkpoint:
+    """What a model needs to continue from the step it was taken at.
+
+    The network, the per node virus state, the transmission log, the step
+    counter, the model's parameters and the state of every random generator:
+    the model's random, which also decides the RandomActivation and
+    FrontierActivation order, the agents' uniforms and the engine's.
+    save() writes the arrays as .npy files next to one pickle of the rest,
+    load() memory-maps them so the network is only read as it is used and
+    shared by every model restored from it. Each restored model copies the
+    state arrays.
+
+    The DataCollector and profiler history are not kept, the logs of a
+    restored model start at the checkpoint's step.
+    """
+
+    def __init__(self, graph, codes, skeptical_level, transmissions, meta):
+        self.graph = graph
+        self.codes = codes
+        self.skeptical_level = skeptical_level
+        self.transmissions = transmissions
+        self.meta = meta
+
+    @property
+    def params(self):
+        return self.meta['params']
+
+    @property
+    def step_number(self):
+        return self.meta['step_number']
+
+    @classmethod
+    def of(cls, model):
+        """Checkpoint of the model as it is now, in memory"""
+        engine = engine_of(model)
+        meta = {
+            'params': dict(model.params),
+            'step_number': model.step_number,
+            'running': model.running,
+            'engine': model.engine,
+            'random': model.random.getstate(),
+            'uniforms': model.uniforms.get_state(),
+            'engine_state': engine.get_state() if engine is not None else None,
+        }
+        return cls(model.network, model.state.codes.copy(), model.state.skeptical_level.copy(),
+                   model.transmissions.events.copy(), meta)
+
+    def save(self, path):
+        # written next to path and renamed in, so a crash never leaves half a checkpoint
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(tmp, name + '.npy'), getattr(self.graph, name))
+        for name in STATE_ARRAYS:
+            np.save(os.path.join(tmp, name + '.npy'), getattr(self, name))
+        with open(os.path.join(tmp, META), 'wb') as f:
+            pickle.dump(self.meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        def array(name):
+            return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+        with open(os.path.join(path, META), 'rb') as f:
+            meta = pickle.load(f)
+        return cls(CSRGraph(*(array(name) for name in GRAPH_ARRAYS)),
+                   *(array(name) for name in STATE_ARRAYS), meta)
+
+    def apply(self, model):
+        """Put the saved state into a model that is being built from this checkpoint"""
+        meta = self.meta
+        model.state.load(self.codes, self.skeptical_level)
+        model.transmissions.load(self.transmissions)
+        model.step_number = meta['step_number']
+        model.running = meta['running']
+        model.random.setstate(meta['random'])
+        model.uniforms.set_state(meta['uniforms'])
+        engine = engine_of(model)
+        # a branch may switch engines, the new one keeps its fresh generator
+        if engine is not None and model.engine == meta['engine']:
+            engine.set_state(meta['engine_state'])
+        schedule = getattr(model, 'schedule', None)
+        if schedule is not None:
+            schedule.steps = schedule.time = meta['step_number']
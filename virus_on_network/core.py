@@ -0,0 +1,315 @@
+import logging
+from types import MappingProxyType
+
+import numpy as np
+
+from .centrality import DEFAULT_CACHE, CentralityReport
+from .checkpoint import Checkpoint
+from .edgelist import read_edgelist
+from .events import EventEngine
+from .frontier import active_nodes
+from .graph import erdos_renyi_graph
+from .output import FileSystemSink, NullSink
+from .profiling import make_profiler
+from .rng import RandomStreams
+from .snapshot import SNAPSHOT_DIR, SnapshotWriter
+from .state import State, VirusState
+from .transmission import TransmissionLog
+from .vectorized import VectorizedEngine
+from .viruses import Viruses
+
+log = logging.getLogger(__name__)
+
+# constructor arguments that are not model parameters
+NOT_PARAMS = ('self', 'output', 'graph', 'profile', 'seed', 'checkpoint')
+
+# first line of every per step log
+LOG_HEADERS = {
+    'infected.csv': 'Step, Virus, [Infected Nodes]\n',
+    'exposed.csv': 'Step, Virus, [Exposed Nodes]\n',
+    'not_infected_or_exposed.csv': 'Step, Virus, [Not Infected or Exposed Nodes]\n',
+}
+
+
+class HeadlessVirusOnNetwork:
+    """VirusOnNetwork without Mesa, for sweeps and scripts.
+
+    Runs the vectorized and events engines and imports no Mesa, pandas or networkx,
+    VirusOnNetwork in model.py adds the agents engine, the grid, the
+    scheduler and the DataCollector on top of it through create_agents(),
+    collect() and step_engine().
+    """
+
+    ENGINES = ("vectorized", "events")
+    ACTIVATIONS = ("random", "frontier")
+
+    def __init__(
+            self,
+            j=0,
+            virus=0,
+            num_nodes=10,
+            avg_node_degree=3,
+            initial_outbreak_size_virus_0=1,
+            initial_outbreak_size_virus_1=1,
+            initial_outbreak_size_virus_2=1,
+            virus_0_spread_chance=1,
+            virus_1_spread_chance=1,
+            virus_2_spread_chance=1,
+            virus_0_check_frequency=0.4,
+            virus_1_check_frequency=0.4,
+            virus_2_check_frequency=0.4,
+            exposed_chance_virus_0=1,
+            exposed_chance_virus_1=1,
+            exposed_chance_virus_2=1,
+            gain_skeptical_chance_virus_0=0.5,
+            gain_skeptical_chance_virus_1=0.5,
+            gain_skeptical_chance_virus_2=0.5,
+            skeptical_level_virus_0=0,
+            skeptical_level_virus_1=0,
+            skeptical_level_virus_2=0,
+            viruses=None,
+            suppression=None,
+            engine=None,
+            activation="random",
+            output=None,
+            centrality=False,
+            centrality_k=None,
+            centrality_cache=DEFAULT_CACHE,
+            graph=None,
+            edgelist=None,
+            profile=None,
+            seed=None,
+            checkpoint=None,
+    ):
+        # the model's own parameters, a Checkpoint keeps them to rebuild it
+        self.params = {name: value for name, value in locals().items() if name not in NOT_PARAMS}
+        # every random number of the run comes from a stream of the seed:
+        # self.random for the outbreak and the schedulers, self.uniforms for
+        # the agents' decisions and one stream each for the graph and engine
+        self.streams = RandomStreams(seed)
+        self.random = self.streams.python_random('model')
+        self.uniforms = self.streams.uniforms('agents')
+        # profile=True keeps per phase timings and counters of every step in
+        # self.profiler.history, a function gets each step's record instead
+        self.profiler = make_profiler(profile)
+
+        self.step_number = 0
+        # a CSRGraph given as graph (e.g. from GraphCache.get) decides the number of nodes
+        if checkpoint is not None:
+            graph = checkpoint.graph
+        # so does an edge list file, streamed into a CSRGraph with the file's
+        # id of every node in node_labels and, if it has none, random weights
+        self.node_labels = None
+        if graph is None and edgelist is not None:
+            graph, self.node_labels = read_edgelist(edgelist, rng=self.streams.generator('graph'))
+        if graph is not None:
+            num_nodes = graph.num_nodes
+        self.num_nodes = num_nodes
+        # output is a Sink (FileSystemSink, MemorySink or NullSink to turn
+        # logging off) or a run directory, by default the working directory
+        if output is None or isinstance(output, str):
+            output = FileSystemSink(output or '.')
+        self.output = output
+        for name, header in LOG_HEADERS.items():
+            self.output.write(name, header)
+        prob = avg_node_degree / self.num_nodes
+        
+        # sparse G(n, p) made bidirectional and weighted in bulk, the weights
+        # come from the graph stream so a seed fixes the whole network
+        if graph is None:
+            self.network = erdos_renyi_graph(self.num_nodes, prob, self.streams.generator('graph'))
+        else:
+            self.network = graph
+        log.info("Number of Edges %d", self.network.num_edges)
+        
+        # "agents" steps one VirusAgent per node through RandomActivation,
+        # "vectorized" runs every node at once on arrays and creates no agents,
+        # "events" runs the same rules in continuous time one event at a time,
+        # which is much faster when little happens per step
+        if engine is None:
+            engine = self.ENGINES[0]
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine must be one of {self.ENGINES}")
+        self.engine = engine
+        # "frontier" only steps the agents that can still change state and
+        # stops the model (running = False) once there are none left
+        if activation not in self.ACTIVATIONS:
+            raise ValueError(f"activation must be one of {self.ACTIVATIONS}")
+        self.activation = activation
+        self.active = None
+        self.j = j
+        self.virus = virus
+        # every virus is a set of parameter arrays, see Viruses. viruses is a
+        # list of per virus dicts with the keys of viruses.DEFAULTS and
+        # suppression the matrix of which virus suppresses which, without
+        # them the first j of the virus_X_* viruses with 0 and 1 opposite
+        if viruses is None:
+            viruses = Viruses.legacy(j, **self.params)
+        elif not isinstance(viruses, Viruses):
+            viruses = Viruses(viruses, suppression)
+        self.viruses = viruses
+        self.num_virus = len(viruses)
+        self.state = VirusState(self.num_virus, self.num_nodes)
+        # who infected whom, written to infected_by.csv once per step
+        self.transmissions = TransmissionLog(self.output)
+        self.state.skeptical_level[:] = viruses.skeptical_level[:, None]
+        self.snapshots = SnapshotWriter(self.output, self.num_virus, self.num_nodes) if self.output.wants(SNAPSHOT_DIR) else None
+        self.create_agents()
+        self.running = True
+        self.collect()
+
+        self.network.write_edgelists(self.output)
+        self.output.flush()
+
+        # centrality is only computed when asked for: centrality=True writes
+        # centrality.csv now, "background" computes it in another process
+        # while the model steps and writes it once it is done. centrality_k
+        # samples that many pivots for betweenness.
+        self.centrality = CentralityReport(self.network, k=centrality_k, cache_dir=centrality_cache)
+        self.centrality_pending = bool(centrality) and self.output.wants('centrality.csv')
+        if self.centrality_pending and centrality == "background":
+            self.centrality.start()
+        elif self.centrality_pending:
+            self.write_centrality()
+
+        if engine == "vectorized":
+            self.vectorized = VectorizedEngine(self, self.network)
+        elif engine == "events":
+            self.events = EventEngine(self, self.network)
+
+        # a checkpoint brings its own state instead of a new outbreak
+        if checkpoint is not None:
+            checkpoint.apply(self)
+        else:
+            self.seed_outbreak()
+        if self.snapshots:
+            self.snapshots.append(self.step_number, self.state)
+        self.transmissions.spill()
+        self.update_frontier()
+
+    def seed_outbreak(self):
+        # Infect some nodes
+        for i in range(self.num_virus):
+            size = min(int(self.viruses.initial_outbreak_size[i]), self.num_nodes)
+            infected_nodes = self.random.sample(range(self.num_nodes), size)
+            for node in infected_nodes:
+                self.state.set_code(i, node, State.INFECTED | State.EXPOSED)
+                self.transmissions.record(0, -1, node, i)
+                for other, level in self.viruses.suppresses[i]:
+                    self.state.skeptical_level[other, node] = level
+                    self.state.set_code(other, node, self.state.codes[other, node] & ~int(State.INFECTED))
+
+        # Gives every node in the graph a level of skepticism
+        for i in range(self.num_virus):
+            skeptics = np.array(self.random.sample(range(self.num_nodes), self.num_nodes), dtype=np.int64)
+            f = np.arange(len(skeptics))
+            self.state.skeptical_level[i, skeptics] = np.select(
+                [f <= int(len(skeptics) * .25), f <= int(len(skeptics) * .50), f <= int(len(skeptics) * .75)],
+                [.20, .40, .60],
+                .80,
+            )
+
+    @property
+    def misinformation(self):
+        # read only {virus: {parameter: value}} of the old model, from self.viruses
+        return MappingProxyType({i: MappingProxyType(params) for i, params in self.viruses.as_dicts().items()})
+
+    def infected_nodes(self, i):
+        return self.state.infected_nodes(i)
+
+    def exposed_nodes(self, i):
+        return self.state.exposed_nodes(i)
+
+    def not_infected_or_exposed_nodes(self, i):
+        return self.state.not_infected_or_exposed_nodes(i)
+
+    def create_agents(self):
+        pass
+
+    def collect(self):
+        pass
+
+    def step_engine(self):
+        if self.engine == "events":
+            self.events.step()
+        else:
+            self.vectorized.step()
+
+    def step(self):
+        profiler = self.profiler
+        profiler.begin_step()
+        written = self.output.bytes_written
+        with profiler.phase('engine'):
+            self.step_engine()
+        with profiler.phase('frontier'):
+            self.update_frontier()
+        self.step_number = self.step_number + 1
+        with profiler.phase('logs'):
+            self.write_step_logs()
+            self.transmissions.spill()
+            if self.centrality_pending and self.centrality.ready():
+                self.write_centrality()
+        with profiler.phase('output'):
+            self.output.end_step()
+        profiler.count('bytes_written', self.output.bytes_written - written)
+        profiler.end_step(self.step_number)
+        # collect data, after the profiler so it can report this step
+        self.collect()
+
+    def update_frontier(self):
+        if self.activation == "frontier":
+            self.active = active_nodes(self)
+            if not len(self.active):
+                self.running = False
+
+    def save_checkpoint(self, path):
+        """Write a Checkpoint of the model as it is now to the directory path"""
+        checkpoint = Checkpoint.of(self)
+        checkpoint.save(path)
+        return checkpoint
+
+    @classmethod
+    def restore(cls, checkpoint, output=None, profile=None, **params):
+        """Model that continues from a Checkpoint or a checkpoint directory.
+
+        params replace the saved parameters from the checkpoint's step on,
+        e.g. gain_skeptical_chance_virus_0=.9 for a what-if run.
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = Checkpoint.load(checkpoint)
+        return cls(checkpoint=checkpoint, output=output, profile=profile, **dict(checkpoint.params, **params))
+
+    def fork(self, branches, outputs=None):
+        """One model per dict of parameters in branches, each continuing from this step.
+
+        The steps so far are shared, every branch gets its own copy of the
+        state and random generators. outputs gives the output of every
+        branch, by default they log nothing.
+        """
+        checkpoint = Checkpoint.of(self)
+        if outputs is None:
+            outputs = [NullSink() for _ in branches]
+        return [type(self).restore(checkpoint, output=output, **params) for params, output in zip(branches, outputs)]
+
+    def write_centrality(self):
+        self.centrality.write(self.output)
+        self.centrality_pending = False
+
+    def write_step_logs(self):
+        # one write per file per step, the sink buffers them
+        if self.snapshots:
+            self.snapshots.append(self.step_number, self.state)
+
+        viruses = range(self.num_virus)
+        for name, nodes in (('infected.csv', self.infected_nodes),
+                            ('exposed.csv', self.exposed_nodes),
+                            ('not_infected_or_exposed.csv', self.not_infected_or_exposed_nodes)):
+            if self.output.wants(name):
+                self.output.write(name, ''.join(f"{self.step_number}, {i}, {nodes(i)},\n" for i in viruses))
+
+    def run_model(self, n):
+        for i in range(n):
+            self.step()
+        if self.centrality_pending:
+            self.write_centrality()
+        self.output.flush()
@@ -0,0 +1,164 @@
+import gzip
+import warnings
+
+import numpy as np
+
+from .graph import WEIGHT_SCHEMES, CSRGraph, _sorted_unique
+
+# bytes of the file parsed per NumPy call
+CHUNK_BYTES = 1 << 26
+GZIP_MAGIC = b'\x1f\x8b'
+# ids up to this many times the number of ids are relabelled with a lookup table
+DENSE_IDS = 4
+
+
+def open_edgelist(path):
+    """Binary file object of path, gzip files are recognised by their first bytes"""
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+
+def _columns(block):
+    for line in block.split(b'\n'):
+        fields = line.split()
+        if fields:
+            if len(fields) < 2:
+                raise ValueError(f"an edge needs a source and a target, got {line!r}")
+            return len(fields)
+    return None
+
+
+def _parse(block, columns):
+    # one fromstring call per chunk, ids parse as int64 unless there are weights
+    dtype = np.int64 if columns == 2 else np.float64
+    with warnings.catch_warnings():
+        # a field that is no number only warns and cuts the chunk short
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(block.decode('latin-1'), dtype=dtype, sep=' ')
+        except (ValueError, DeprecationWarning) as e:
+            raise ValueError(f"not an edge list: {e}") from None
+    if len(values) % columns:
+        raise ValueError(f"every line of an edge list needs {columns} columns")
+    return values.reshape(-1, columns)
+
+
+def relabel_ids(ids):
+    """Sorted distinct ids and the position of every id among them"""
+    if not len(ids):
+        return ids, ids
+    if ids.min() >= 0 and ids.max() < DENSE_IDS * len(ids):
+        seen = np.zeros(ids.max() + 1, dtype=bool)
+        seen[ids] = True
+        return np.flatnonzero(seen), (np.cumsum(seen) - 1)[ids]
+    # sparse ids, e.g. account numbers, cost a sort instead
+    order = np.argsort(ids)
+    ordered = ids[order]
+    new = np.empty(len(ids), dtype=bool)
+    new[:1] = True
+    np.not_equal(ordered[1:], ordered[:-1], out=new[1:])
+    positions = np.empty(len(ids), dtype=np.int64)
+    positions[order] = np.cumsum(new) - 1
+    return ordered[new], positions
+
+
+def iter_edge_chunks(path, comments='#', delimiter=None, chunk_bytes=CHUNK_BYTES):
+    """(src, dst, weights) arrays of consecutive parts of an edge list file.
+
+    Lines are "source target [weight ...]" with integer node ids, split on
+    whitespace or delimiter. The first line decides whether there is a
+    weight column, weights is None without one, columns after it are
+    ignored. Whatever follows comments on a line is skipped. Only chunk_bytes of the
+    file are held at a time, plus the parsed arrays of that chunk.
+    """
+    marker = comments.encode() if comments else None
+    columns = None
+    rest = b''
+    with open_edgelist(path) as f:
+        while True:
+            data = f.read(chunk_bytes)
+            block = rest + data
+            if data:
+                # a line cut by the chunk waits for the next one
+                cut = block.rfind(b'\n') + 1
+                block, rest = block[:cut], block[cut:]
+            if delimiter is not None:
+                block = block.replace(delimiter.encode(), b' ')
+            if marker is not None and marker in block:
+                block = b'\n'.join(line.partition(marker)[0] for line in block.split(b'\n'))
+            if columns is None:
+                columns = _columns(block)
+            if columns is not None and block.strip():
+                values = _parse(block, columns)
+                if columns == 2:
+                    yield values[:, 0].copy(), values[:, 1].copy(), None
+                else:
+                    yield values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), values[:, 2].copy()
+            if not data:
+                break
+
+
+def read_edgelist(path, relabel=True, symmetrize=True, weights='uniform', rng=None,
+                  comments='#', delimiter=None, chunk_bytes=CHUNK_BYTES):
+    """CSRGraph of a plain or gzip edge list file and the file's id of every node.
+
+    The file is streamed in chunks (see iter_edge_chunks) into flat id
+    arrays, nothing goes through networkx. relabel numbers the ids that
+    occur 0..n-1 in sorted order and returns them as labels, so labels[node]
+    is the file's id of node. Without it the ids are used as they are,
+    n is the largest one + 1 and labels is None.
+
+    symmetrize adds the reverse of every edge that has none, like the old
+    create_bidirectional_edges. Self loops and repeated edges are dropped,
+    the first line of an edge decides its weight and a reverse edge gets
+    the weight of its edge. Files without weights get a weight per
+    directed edge drawn from WEIGHT_SCHEMES[weights] with rng. Weighted
+    files parse as floats, so their ids must be below 2 ** 53.
+    """
+    if weights not in WEIGHT_SCHEMES:
+        raise ValueError(f"weights must be one of {sorted(WEIGHT_SCHEMES)}")
+    if rng is None:
+        rng = np.random.default_rng()
+    chunks = list(iter_edge_chunks(path, comments, delimiter, chunk_bytes))
+    src = np.concatenate([c[0] for c in chunks]) if chunks else np.empty(0, dtype=np.int64)
+    dst = np.concatenate([c[1] for c in chunks]) if chunks else np.empty(0, dtype=np.int64)
+    w = np.concatenate([c[2] for c in chunks]) if chunks and chunks[0][2] is not None else None
+    del chunks
+
+    if relabel:
+        labels, positions = relabel_ids(np.concatenate([src, dst]))
+        src, dst = positions[:len(src)], positions[len(src):]
+        num_nodes = len(labels)
+    else:
+        labels = None
+        if len(src) and min(src.min(), dst.min()) < 0:
+            raise ValueError("node ids must not be negative without relabel")
+        num_nodes = int(max(src.max(), dst.max())) + 1 if len(src) else 0
+
+    loops = src == dst
+    if loops.any():
+        src, dst = src[~loops], dst[~loops]
+        w = w[~loops] if w is not None else None
+    # one int64 key per directed edge, sorted keys are the CSR order
+    keys = src * num_nodes + dst
+    if symmetrize:
+        keys = np.concatenate([keys, dst * num_nodes + src])
+        w = np.concatenate([w, w]) if w is not None else None
+    del src, dst
+    if w is None:
+        keys = _sorted_unique(keys)
+        w = WEIGHT_SCHEMES[weights](rng, len(keys))
+    else:
+        order = np.argsort(keys, kind='stable')
+        keys, w = keys[order], w[order]
+        first = np.empty(len(keys), dtype=bool)
+        first[:1] = True
+        np.not_equal(keys[1:], keys[:-1], out=first[1:])
+        keys, w = keys[first], w[first]
+
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    if num_nodes:
+        np.cumsum(np.bincount(keys // num_nodes, minlength=num_nodes), out=indptr[1:])
+        keys %= num_nodes
+    return CSRGraph(indptr, keys, w), labels
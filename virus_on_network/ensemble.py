@@ -0,0 +1,134 @@
+import numpy as np
+
+from .core import HeadlessVirusOnNetwork
+from .output import NullSink
+from .state import COMPARTMENT, EXPOSED, INFECTED, SUSCEPTIBLE, State
+from .vectorized import JointKernel
+
+
+class Ensemble:
+    """Many independent replicates of the vectorized engine over one network.
+
+    codes and skeptical_level have shape (virus, replicate, node) and every
+    step runs the VectorizedEngine's JointKernel sub-rounds over all viruses
+    and replicates at once, node n of replicate r being site r * num_nodes + n. Keyword
+    arguments are those of VirusOnNetwork, one HeadlessVirusOnNetwork reads
+    them and builds the network (or takes graph) for every replicate.
+    Replicates share the network and the parameters, their outbreak seeds,
+    skeptical levels and draws are their own. Who infected whom is not
+    logged.
+
+    After every step the number of susceptible, exposed and infected nodes
+    of every replicate and virus is added to counts, see time_series().
+    """
+
+    def __init__(self, replicates, seed=None, **params):
+        template = HeadlessVirusOnNetwork(seed=seed, output=NullSink(), **params)
+        self.viruses = template.viruses
+        self.graph = template.network
+        self.num_nodes = template.num_nodes
+        self.replicates = replicates
+        self.rng = template.streams.generator('ensemble')
+        # virus k of node n of replicate r is flat id (k * replicates + r) * num_nodes + n
+        self.kernel = JointKernel(self.graph, self.viruses, replicates * self.num_nodes, self.rng)
+
+        num_virus = len(self.viruses)
+        self.codes = np.zeros((num_virus, replicates, self.num_nodes), dtype=np.int8)
+        self.skeptical_level = np.zeros((num_virus, replicates, self.num_nodes))
+        self.skeptical_level[:] = self.viruses.skeptical_level[:, None, None]
+        self.seed_nodes()
+        self.step_number = 0
+        self.counts = [self.count()]
+
+    def seed_nodes(self):
+        # the same seeding as the model, drawn separately for every replicate
+        num_nodes = self.num_nodes
+        for i in range(len(self.viruses)):
+            size = min(int(self.viruses.initial_outbreak_size[i]), num_nodes)
+            nodes = np.argsort(self.rng.random((self.replicates, num_nodes)), axis=1)[:, :size].ravel()
+            rows = np.repeat(np.arange(self.replicates), size)
+            self.codes[i, rows, nodes] = State.INFECTED | State.EXPOSED
+            for other, level in self.viruses.suppresses[i]:
+                self.skeptical_level[other, rows, nodes] = level
+                self.codes[other, rows, nodes] &= ~int(State.INFECTED)
+
+        f = np.arange(num_nodes)
+        levels = np.select([f <= int(num_nodes * .25), f <= int(num_nodes * .50), f <= int(num_nodes * .75)],
+                           [.20, .40, .60], .80)
+        for i in range(len(self.viruses)):
+            order = np.argsort(self.rng.random((self.replicates, num_nodes)), axis=1)
+            np.put_along_axis(self.skeptical_level[i], order, np.broadcast_to(levels, order.shape), axis=1)
+
+    def step(self):
+        # JointKernel sub-rounds over every virus and replicate
+        kernel = self.kernel
+        codes = self.codes.reshape(-1)
+        level = self.skeptical_level.reshape(-1)
+        for flat in kernel.sub_rounds(len(self.viruses)):
+            exposed, _ = kernel.exposures(codes, level, flat)
+            codes[exposed] = State.EXPOSED
+            candidates, check = kernel.checks(codes, flat)
+            gaining = candidates[~check & ((codes[candidates] & State.EXPOSED) != 0)]
+            checking = candidates[check]
+            sources = checking[(codes[checking] & State.INFECTED) != 0]
+            _, targets, _ = kernel.infections(codes, level, sources)
+            codes[targets] = State.INFECTED
+            suppressed, levels, cleared = self.viruses.suppression_effects(targets, kernel.block, self.rng)
+            level[suppressed] = levels
+            codes[cleared] &= ~int(State.INFECTED)
+            kernel.gain_skeptical(gaining, level)
+        self.step_number += 1
+        self.counts.append(self.count())
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+        return self
+
+    def count(self):
+        # (replicate, virus, compartment) number of nodes
+        compartment = COMPARTMENT[self.codes]
+        counts = np.stack([(compartment == c).sum(axis=2) for c in (SUSCEPTIBLE, EXPOSED, INFECTED)], axis=-1)
+        return counts.transpose(1, 0, 2)
+
+    def time_series(self):
+        """(step, replicate, virus, compartment) number of susceptible, exposed and infected nodes"""
+        return np.stack(self.counts)
+
+    def final_sizes(self):
+        """(replicate, virus) number of infected nodes after the last step"""
+        return self.counts[-1][:, :, INFECTED]
+
+    def summary(self, low=.025, high=.975):
+        """Mean, spread and quantiles of the final size of every virus over the replicates"""
+        sizes = self.final_sizes()
+        return {
+            i: {
+                'mean': float(sizes[:, i].mean()),
+                'std': float(sizes[:, i].std(ddof=1)) if self.replicates > 1 else 0.0,
+                'low': float(np.quantile(sizes[:, i], low)),
+                'median': float(np.median(sizes[:, i])),
+                'high': float(np.quantile(sizes[:, i], high)),
+            }
+            for i in range(len(self.viruses))
+        }
+
+    def to_dataframe(self):
+        """time_series() as one row per step, replicate and virus"""
+        import pandas as pd
+        series = self.time_series()
+        steps, replicates, viruses = np.meshgrid(
+            np.arange(series.shape[0]), np.arange(series.shape[1]), np.arange(series.shape[2]), indexing='ij')
+        return pd.DataFrame({
+            'step': steps.ravel(),
+            'replicate': replicates.ravel(),
+            'virus': viruses.ravel(),
+            'susceptible': series[..., SUSCEPTIBLE].ravel(),
+            'exposed': series[..., EXPOSED].ravel(),
+            'infected': series[..., INFECTED].ravel(),
+        })
+
+
+def run_ensemble(replicates, steps, seed=None, **params):
+    """Run replicates of one parameter point for steps steps, returns the Ensemble"""
+    return Ensemble(replicates, seed=seed, **params).run(steps)
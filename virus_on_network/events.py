@@ -0,0 +1,205 @@
+import heapq
+
+import numpy as np
+
+from .graph import CSRGraph
+from .state import State
+
+# kinds of clocks, all of them belong to one (virus, node)
+EXPOSE, INFECT, SKEPTICAL = 0, 1, 2
+
+
+class EventEngine:
+    """Continuous time version of the VirusAgent rules, one event at a time.
+
+    An agent acts about once per unit of time, so every rule fires at the
+    rate of its chance per step: exposing a susceptible neighbor (the
+    source's skeptical level), infecting an exposed neighbor (check
+    frequency * spread chance * edge weight * (1 - skeptical level)) and
+    gaining skepticism ((1 - check frequency) * gain chance). Like an agent
+    that checks right after exposing its neighbors, an exposure infects
+    the neighbor at once with the infect chance.
+
+    An infected node keeps a count of its susceptible and of its exposed
+    neighbors and has one expose and one infect clock ticking at count times
+    rate, so a node with nothing left to do has no clock at all. Infecting
+    uses the node's heaviest edge for the rate and picks an exposed neighbor
+    at random, which is infected with chance real rate / that rate
+    (thinning). Clocks wait in a heap and are dropped by bumping the
+    version of their node whenever the node or a neighbor changes.
+
+    step() runs every event up to the next whole unit of time, so logs and
+    step numbers line up with the other engines and a step without events
+    costs a look at the top of the heap instead of a pass over every node.
+    The first steps match the agents engine, later ones fall a little
+    behind: a node infected during a step of the agents engine acts on
+    average half a step later, here a whole unit of time. 400 nodes,
+    degree 4, j=2, spread .8, check .6, 3 seeds per virus, 300 runs: 155
+    infected after 8 steps against 167 with agents (34 against 35 after 4).
+    """
+
+    def __init__(self, model, graph):
+        self.model = model
+        self.graph = graph
+        self.state = model.state
+        self.random = model.streams.python_random('events')
+        self.time = 0.0
+        self.queue = []
+        self.started = False
+        num_virus, num_nodes = self.state.codes.shape
+        self.version = [[0] * num_nodes for _ in range(num_virus)]
+        self.susceptible = [None] * num_virus
+        self.exposed = [None] * num_virus
+        self.indptr = graph.indptr
+        self.indices = graph.indices
+        self.weights = graph.weights
+        # who has a node as neighbor, the same as its neighbors unless the graph is directed
+        reverse = CSRGraph.from_edges(num_nodes, graph.indices, graph.sources(), graph.weights)
+        self.in_indptr = reverse.indptr
+        self.in_indices = reverse.indices
+        self.max_weight = np.zeros(num_nodes)
+        has_edges = graph.out_degree() > 0
+        if has_edges.any():
+            self.max_weight[has_edges] = np.maximum.reduceat(graph.weights, graph.indptr[:-1][has_edges])
+
+    def get_state(self):
+        # the clocks and counts, the graph arrays are rebuilt from the network
+        return {
+            'random': self.random.getstate(),
+            'time': self.time,
+            'queue': list(self.queue),
+            'started': self.started,
+            'version': [list(version) for version in self.version],
+            'susceptible': [None if a is None else a.copy() for a in self.susceptible],
+            'exposed': [None if a is None else a.copy() for a in self.exposed],
+        }
+
+    def set_state(self, state):
+        self.random.setstate(state['random'])
+        self.time = state['time']
+        self.queue = list(state['queue'])
+        self.started = state['started']
+        self.version = [list(version) for version in state['version']]
+        self.susceptible = [None if a is None else a.copy() for a in state['susceptible']]
+        self.exposed = [None if a is None else a.copy() for a in state['exposed']]
+
+    def infect_rate(self, i, weight, level):
+        viruses = self.model.viruses
+        return viruses.virus_check_frequency[i] * viruses.spread_chance[i] * weight * (1 - level)
+
+    def push(self, clock_rate, kind, i, node):
+        heapq.heappush(self.queue, (self.time + self.random.expovariate(clock_rate), kind, i, node,
+                                    self.version[i][node]))
+
+    def schedule(self, i, node):
+        """Replace the clocks of node for virus i after it or a neighbor changed"""
+        self.version[i][node] += 1
+        code = int(self.state.codes[i, node])
+        level = float(self.state.skeptical_level[i, node])
+        if code & State.INFECTED:
+            expose = self.susceptible[i][node] * level
+            if expose > 0:
+                self.push(expose, EXPOSE, i, node)
+            infect = self.exposed[i][node] * self.infect_rate(i, self.max_weight[node], level)
+            if infect > 0:
+                self.push(infect, INFECT, i, node)
+        if code & State.EXPOSED and level < 1:
+            viruses = self.model.viruses
+            gain = (1 - viruses.virus_check_frequency[i]) * viruses.gain_skeptical_chance[i]
+            if gain > 0:
+                self.push(gain, SKEPTICAL, i, node)
+
+    def set_code(self, i, node, code):
+        old = self.state.codes[i, node]
+        self.state.set_code(i, node, code)
+        susceptible = int(code == State.SUSCEPTIBLE) - int(old == State.SUSCEPTIBLE)
+        exposed = int(code == State.EXPOSED) - int(old == State.EXPOSED)
+        if susceptible or exposed:
+            codes = self.state.codes[i]
+            for k in range(self.in_indptr[node], self.in_indptr[node + 1]):
+                neighbor = self.in_indices[k]
+                self.susceptible[i][neighbor] += susceptible
+                self.exposed[i][neighbor] += exposed
+                if codes[neighbor] & State.INFECTED:
+                    self.schedule(i, neighbor)
+        self.schedule(i, node)
+
+    def pick_neighbor(self, i, node, code, count):
+        # edge to the k-th neighbor of node that has the given code
+        k = int(self.random.random() * count)
+        codes = self.state.codes[i]
+        for edge in range(self.indptr[node], self.indptr[node + 1]):
+            if codes[self.indices[edge]] == code:
+                if k == 0:
+                    return edge
+                k -= 1
+
+    def expose(self, i, node):
+        edge = self.pick_neighbor(i, node, State.SUSCEPTIBLE, self.susceptible[i][node])
+        self.set_code(i, self.indices[edge], State.EXPOSED)
+        self.model.profiler.count('exposures')
+        # the check right after exposing may infect the neighbor just exposed
+        level = float(self.state.skeptical_level[i, node])
+        if self.random.random() < self.infect_rate(i, self.weights[edge], level):
+            self.transmit(i, node, edge)
+
+    def infect(self, i, node):
+        edge = self.pick_neighbor(i, node, State.EXPOSED, self.exposed[i][node])
+        level = float(self.state.skeptical_level[i, node])
+        bound = self.infect_rate(i, self.max_weight[node], level)
+        # the clock ran at the heaviest edge's rate, lighter edges infect less often
+        if self.random.random() * bound >= self.infect_rate(i, self.weights[edge], level):
+            self.push(self.exposed[i][node] * bound, INFECT, i, node)
+            self.model.profiler.count('rejected_events')
+            return
+        self.transmit(i, node, edge)
+
+    def transmit(self, i, node, edge):
+        target = self.indices[edge]
+        self.model.transmissions.record(self.model.step_number + 1, node, target, i)
+        self.model.profiler.count('infections')
+        for other, suppressed in self.model.viruses.suppresses[i]:
+            self.state.skeptical_level[other, target] = suppressed
+            self.set_code(other, target, self.state.codes[other, target] & ~int(State.INFECTED))
+        self.set_code(i, target, State.INFECTED)
+
+    def gain_skeptical(self, i, node):
+        level = self.state.skeptical_level[i, node]
+        self.state.skeptical_level[i, node] = level + .10 if level < .91 else 1
+        self.schedule(i, node)
+
+    def start(self):
+        # the model seeds its nodes after creating the engine
+        sources, targets = self.graph.edges()
+        num_nodes = self.graph.num_nodes
+        for i in range(len(self.version)):
+            codes = self.state.codes[i, targets]
+            self.susceptible[i] = np.bincount(sources, weights=codes == State.SUSCEPTIBLE,
+                                              minlength=num_nodes).astype(np.int64)
+            self.exposed[i] = np.bincount(sources, weights=codes == State.EXPOSED,
+                                          minlength=num_nodes).astype(np.int64)
+        for i in range(len(self.version)):
+            for node in np.flatnonzero(self.state.codes[i]).tolist():
+                self.schedule(i, node)
+        self.started = True
+
+    def step(self):
+        if not self.started:
+            self.start()
+        end = self.model.step_number + 1
+        queue = self.queue
+        events = 0
+        while queue and queue[0][0] < end:
+            time, kind, i, node, version = heapq.heappop(queue)
+            if version != self.version[i][node]:
+                continue
+            self.time = time
+            events += 1
+            if kind == EXPOSE:
+                self.expose(i, node)
+            elif kind == INFECT:
+                self.infect(i, node)
+            else:
+                self.gain_skeptical(i, node)
+        self.time = end
+        self.model.profiler.count('events', events)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from .graph import _sorted_unique
+from .state import EXPOSED, INFECTED, State
+
+
+def _members(nodes):
+    return np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+
+
+def active_nodes(model):
+    """Sorted array of the nodes that can still change some state when stepped.
+
+    Per virus that is an infected node with a susceptible neighbor it can
+    expose or an exposed neighbor it can infect, and a node with the exposed
+    flag that can still gain skepticism. Any other node only uses up random
+    numbers in VirusAgent.step. Costs the number of infected and exposed
+    nodes and their edges, not the number of nodes.
+    """
+    state = model.state
+    graph = model.network
+    active = []
+    viruses = model.viruses
+    for i in range(len(viruses)):
+        codes = state.codes[i]
+        infected = _members(state.compartments[i][INFECTED])
+
+        edges = graph.out_edges(infected)
+        targets = codes[graph.indices[edges]]
+        level = state.skeptical_level[i, graph.sources()[edges]]
+        # exposing uses the source's skeptical level as chance, infecting
+        # needs a check, a spread chance and a level below 1
+        can_infect = viruses.virus_check_frequency[i] > 0 and viruses.spread_chance[i] > 0
+        live = (targets == State.SUSCEPTIBLE) & (level > 0)
+        if can_infect:
+            live |= (targets == State.EXPOSED) & (level < 1) & (graph.weights[edges] > 0)
+        active.append(graph.sources()[edges[live]])
+
+        # gaining skepticism happens on a failed check, up to a level of 1
+        if viruses.gain_skeptical_chance[i] > 0 and viruses.virus_check_frequency[i] < 1:
+            exposed = np.concatenate([_members(state.compartments[i][EXPOSED]),
+                                      infected[(codes[infected] & State.EXPOSED) != 0]])
+            active.append(exposed[state.skeptical_level[i, exposed] < 1])
+    if not active:
+        return np.empty(0, dtype=np.int64)
+    return _sorted_unique(np.concatenate(active))
@@ -0,0 +1,137 @@
+import numpy as np
+
+# below this many possible edges G(n, p) is drawn with one coin per pair
+DENSE_PAIRS = 1 << 22
+
+# how the weight of every directed edge is drawn
+WEIGHT_SCHEMES = {
+    'uniform': lambda rng, size: rng.random(size),
+    'constant': lambda rng, size: np.ones(size),
+}
+
+
+class CSRGraph:
+    """Directed weighted graph stored as CSR arrays (indptr, indices, weights)"""
+
+    def __init__(self, indptr, indices, weights):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self._sources = None
+
+    @classmethod
+    def from_networkx(cls, G, weight='weight'):
+        # nodes are expected to be labelled 0..n-1 like nx.erdos_renyi_graph does
+        num_nodes = G.number_of_nodes()
+        num_edges = G.number_of_edges()
+        src = np.empty(num_edges, dtype=np.int64)
+        dst = np.empty(num_edges, dtype=np.int64)
+        w = np.empty(num_edges, dtype=np.float64)
+        for k, (a, b, data) in enumerate(G.edges(data=weight, default=1.0)):
+            src[k] = a
+            dst[k] = b
+            w[k] = data
+        return cls.from_edges(num_nodes, src, dst, w)
+
+    @classmethod
+    def from_edges(cls, num_nodes, src, dst, weights):
+        order = np.argsort(src * num_nodes + dst, kind='stable')
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, dst[order], weights[order])
+
+    def edges(self):
+        return self.sources(), self.indices
+
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.DiGraph()
+        G.add_nodes_from(range(self.num_nodes))
+        src, dst = self.edges()
+        G.add_weighted_edges_from(zip(src.tolist(), dst.tolist(), self.weights.tolist()))
+        return G
+
+    def write_edgelists(self, sink):
+        # weighted_edgelist.csv and edgelist.csv in one write each
+        if not (sink.wants('weighted_edgelist.csv') or sink.wants('edgelist.csv')):
+            return
+        src, dst = self.edges()
+        src, dst = src.tolist(), dst.tolist()
+        if sink.wants('weighted_edgelist.csv'):
+            sink.write('weighted_edgelist.csv', ''.join(
+                f"({a}, {b}),{w},\n" for a, b, w in zip(src, dst, self.weights.tolist())))
+        if sink.wants('edgelist.csv'):
+            sink.write('edgelist.csv', ''.join(f"|{a},{b}" for a, b in zip(src, dst)) + '|')
+
+    @property
+    def num_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def sources(self):
+        # source node of every edge, the COO row array of the CSR matrix
+        if self._sources is None:
+            self._sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        return self._sources
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def out_edges(self, nodes):
+        """Edge indices of every out edge of the given nodes"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return offsets + np.arange(total)
+
+
+def _sorted_unique(values):
+    # np.unique without its overhead, values are plain int64 keys
+    values = np.sort(values)
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def erdos_renyi_edges(num_nodes, p, rng):
+    """Directed G(n, p) without self loops as (src, dst) arrays in O(n + E)"""
+    pairs = num_nodes * (num_nodes - 1)
+    p = min(max(p, 0.0), 1.0)
+    if pairs <= DENSE_PAIRS:
+        picked = np.flatnonzero(rng.random(pairs) < p)
+    else:
+        # the number of edges is binomial and, given that number, every set
+        # of ordered pairs is equally likely
+        count = rng.binomial(pairs, p)
+        picked = _sorted_unique(rng.integers(0, pairs, size=count))
+        while len(picked) < count:
+            extra = rng.integers(0, pairs, size=count - len(picked))
+            picked = _sorted_unique(np.concatenate([picked, extra]))
+    # pair k is u = k // (n - 1) and the (k % (n - 1))-th node other than u
+    src = picked // (num_nodes - 1)
+    dst = picked % (num_nodes - 1)
+    dst += dst >= src
+    return src, dst
+
+
+def symmetrize(num_nodes, src, dst):
+    """Add the reverse of every edge that has none, dropping duplicates"""
+    keys = _sorted_unique(np.concatenate([src * num_nodes + dst, dst * num_nodes + src]))
+    return keys // num_nodes, keys % num_nodes
+
+
+def erdos_renyi_graph(num_nodes, p, rng, weights='uniform'):
+    """Bidirectional G(n, p) with a random weight on every directed edge"""
+    if weights not in WEIGHT_SCHEMES:
+        raise ValueError(f"weights must be one of {sorted(WEIGHT_SCHEMES)}")
+    src, dst = erdos_renyi_edges(num_nodes, p, rng)
+    src, dst = symmetrize(num_nodes, src, dst)
+    return CSRGraph.from_edges(num_nodes, src, dst, WEIGHT_SCHEMES[weights](rng, len(src)))
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .edgelist import read_edgelist
+from .graph import WEIGHT_SCHEMES, CSRGraph, erdos_renyi_graph
+from .rng import RandomStreams
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'virus_on_network', 'graphs')
+
+ARRAYS = ('indptr', 'indices', 'weights')
+# file ids of the nodes of a relabelled edge list
+LABELS = 'labels'
+# part of every key, bumped whenever the same key would give another graph
+FORMAT = 'streams-1'
+
+
+def graph_key(num_nodes, avg_node_degree, seed, weights='uniform'):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((FORMAT, int(num_nodes), float(avg_node_degree), int(seed), weights)).encode())
+    return h.hexdigest()
+
+
+def edgelist_key(path, seed, **options):
+    # a changed file is a new entry
+    stat = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((FORMAT, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, int(seed),
+                   sorted(options.items()))).encode())
+    return 'edgelist-' + h.hexdigest()
+
+
+class GraphCache:
+    """On-disk store of generated weighted networks.
+
+    A network is addressed by (num_nodes, avg_node_degree, seed, weights) and
+    stored as the raw .npy CSR arrays of a CSRGraph, so get() memory-maps
+    them instead of regenerating or parsing anything. Entries are evicted
+    least recently used first once the cache holds more than max_bytes.
+    get_edgelist() keeps parsed edge list files the same way.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, num_nodes, avg_node_degree, seed, weights='uniform'):
+        return os.path.join(self.directory, graph_key(num_nodes, avg_node_degree, seed, weights))
+
+    def __contains__(self, key):
+        return os.path.isdir(self.path(*key))
+
+    def get(self, num_nodes, avg_node_degree, seed, weights='uniform'):
+        """Memory-mapped CSRGraph for the key, generated and stored on a miss"""
+        if weights not in WEIGHT_SCHEMES:
+            raise ValueError(f"weights must be one of {sorted(WEIGHT_SCHEMES)}")
+        path = self.path(num_nodes, avg_node_degree, seed, weights)
+        if not os.path.isdir(path):
+            # the model's own graph stream, so a cached graph is the one the model would build
+            rng = RandomStreams(seed).generator('graph')
+            network = erdos_renyi_graph(num_nodes, avg_node_degree / num_nodes, rng, weights)
+            self.put(path, network)
+            self.evict(keep=path)
+        # the directory mtime is the last use for eviction
+        os.utime(path)
+        return CSRGraph(*(np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in ARRAYS))
+
+    def get_edgelist(self, path, seed=0, **options):
+        """Memory-mapped (CSRGraph, labels) of an edge list file, see edgelist.read_edgelist.
+
+        The file is parsed once per seed and options, later calls only map
+        the stored arrays. seed draws the weights of a file without them.
+        """
+        entry = os.path.join(self.directory, edgelist_key(path, seed, **options))
+        if not os.path.isdir(entry):
+            network, labels = read_edgelist(path, rng=RandomStreams(seed).generator('graph'), **options)
+            self.put(entry, network, labels)
+            self.evict(keep=entry)
+        os.utime(entry)
+        labels = os.path.join(entry, LABELS + '.npy')
+        return (CSRGraph(*(np.load(os.path.join(entry, name + '.npy'), mmap_mode='r') for name in ARRAYS)),
+                np.load(labels, mmap_mode='r') if os.path.exists(labels) else None)
+
+    def put(self, path, network, labels=None):
+        os.makedirs(self.directory, exist_ok=True)
+        # written next to the cache and renamed in, so parallel runs asking
+        # for the same graph never see half an entry
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, name + '.npy'), getattr(network, name))
+        if labels is not None:
+            np.save(os.path.join(tmp, LABELS + '.npy'), labels)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # someone else stored it first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def entries(self):
+        """(last used, bytes, path) of every entry, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,39 @@
+// Buttons for BackgroundServer in background.py. The model runs on the
+// server, the page keeps asking for frames with the usual play button and
+// each frame shows whatever step the model got to.
+const BackgroundControls = function () {
+  const div = document.createElement("div");
+  div.innerHTML =
+    '<button class="btn btn-default" id="bg-run">Run in background</button> ' +
+    '<button class="btn btn-default" id="bg-pause">Pause</button> ' +
+    '<input type="number" id="bg-steps" value="100" min="1" style="width: 6em"> ' +
+    '<button class="btn btn-default" id="bg-advance">Advance</button> ' +
+    '<span id="bg-step"></span>';
+  document.getElementById("elements").appendChild(div);
+
+  div.querySelector("#bg-run").onclick = () => {
+    send({ type: "run" });
+    // start sampling frames if the play button is not already
+    if (!controller.running) {
+      controller.start();
+    }
+  };
+  div.querySelector("#bg-pause").onclick = () => {
+    send({ type: "pause" });
+    if (controller.running) {
+      controller.stop();
+    }
+  };
+  div.querySelector("#bg-advance").onclick = () => {
+    const steps = parseInt(div.querySelector("#bg-steps").value, 10) || 1;
+    send({ type: "advance", steps: steps });
+  };
+
+  this.render = (data) => {
+    div.querySelector("#bg-step").textContent = "model step " + data.step;
+  };
+
+  this.reset = () => {
+    div.querySelector("#bg-step").textContent = "";
+  };
+};
@@ -0,0 +1,120 @@
+// Network view for DeltaNetworkModule in network_module.py. A "full" frame
+// lays out and draws the whole network, "delta" frames only recolor the
+// nodes and edges they list. Tooltips are asked from the server on hover.
+const DeltaNetworkModule = function (svg_width, svg_height) {
+  const svg = d3.create("svg");
+  svg
+    .attr("class", "NetworkModule_d3")
+    .attr("width", svg_width)
+    .attr("height", svg_height)
+    .style("border", "1px dotted");
+
+  document.getElementById("elements").appendChild(svg.node());
+
+  const width = +svg.attr("width");
+  const height = +svg.attr("height");
+  const g = svg.append("g").classed("network_root", true);
+
+  const tooltip = d3
+    .select("body")
+    .append("div")
+    .attr("class", "d3tooltip")
+    .style("opacity", 0);
+
+  const zoom = d3.zoom().on("zoom", (event) => {
+    g.attr("transform", event.transform);
+  });
+  svg.call(zoom);
+  svg.call(zoom.transform, d3.zoomIdentity.translate(width / 2, height / 2));
+
+  const links = g.append("g").attr("class", "links");
+  const nodes = g.append("g").attr("class", "nodes");
+
+  // one svg element per node and edge, indexed like the frames
+  let circles = [];
+  let lines = [];
+
+  const showTooltip = (event, d) => {
+    fetch("/tooltip/" + d.id)
+      .then((response) => response.text())
+      .then((text) => {
+        tooltip.transition().duration(200).style("opacity", 0.9);
+        tooltip
+          .html(text)
+          .style("left", event.pageX + "px")
+          .style("top", event.pageY + "px");
+      });
+  };
+
+  const drawFull = (graph) => {
+    const simulation = d3
+      .forceSimulation()
+      .nodes(graph.nodes)
+      .force("charge", d3.forceManyBody().strength(-80).distanceMin(2))
+      .force("link", d3.forceLink(graph.edges))
+      .force("center", d3.forceCenter())
+      .stop();
+
+    const ticks = Math.ceil(
+      Math.log(simulation.alphaMin()) / Math.log(1 - simulation.alphaDecay())
+    );
+    for (let i = 0; i < ticks; ++i) {
+      simulation.tick();
+    }
+
+    links.selectAll("line").remove();
+    nodes.selectAll("circle").remove();
+
+    lines = links
+      .selectAll("line")
+      .data(graph.edges)
+      .enter()
+      .append("line")
+      .attr("x1", (d) => d.source.x)
+      .attr("y1", (d) => d.source.y)
+      .attr("x2", (d) => d.target.x)
+      .attr("y2", (d) => d.target.y)
+      .attr("stroke-width", (d) => d.width)
+      .attr("stroke", (d) => d.color)
+      .nodes();
+
+    circles = nodes
+      .selectAll("circle")
+      .data(graph.nodes)
+      .enter()
+      .append("circle")
+      .attr("cx", (d) => d.x)
+      .attr("cy", (d) => d.y)
+      .attr("r", (d) => d.size)
+      .attr("fill", (d) => d.color)
+      .on("mouseover", showTooltip)
+      .on("mouseout", () => {
+        tooltip.transition().duration(500).style("opacity", 0);
+      })
+      .nodes();
+  };
+
+  const applyDelta = (delta) => {
+    delta.nodes.forEach(([node, color]) => {
+      d3.select(circles[node]).attr("fill", color);
+    });
+    delta.edges.forEach(([edge, color, width]) => {
+      d3.select(lines[edge]).attr("stroke", color).attr("stroke-width", width);
+    });
+  };
+
+  this.render = (data) => {
+    if (data.type === "full") {
+      drawFull(data);
+    } else if (circles.length) {
+      applyDelta(data);
+    }
+  };
+
+  this.reset = () => {
+    links.selectAll("line").remove();
+    nodes.selectAll("circle").remove();
+    circles = [];
+    lines = [];
+  };
+};
@@ -1,15 +1,18 @@
+import heapq
 import math
 from enum import Enum
-import networkx as nx
-from virus_on_network import server
 import mesa
 import csv
 import copy
 import time
 from datetime import date
-import pandas as pd
 import random
-import numpy as np
+import logging
+from .core import HeadlessVirusOnNetwork
+from .graph import CSRGraph
+from .state import AgentMisinformation, State
+
+log = logging.getLogger(__name__)
 
 t = time.localtime()
 current_time = time.strftime("%H:%M:%S", t)
@@ -32,116 +35,18 @@ def batch_csv():
         f.write(",")
 
 
-
-class VirusOnNetwork(mesa.Model):
+class VirusOnNetwork(HeadlessVirusOnNetwork, mesa.Model):
     """A virus model with some number of agents"""
 
     # create_csv()
 
-    def __init__(
-            self,
-            j=0,
-            virus=0,
-            num_nodes=10,
-            avg_node_degree=3,
-            initial_outbreak_size_virus_0=1,
-            initial_outbreak_size_virus_1=1,
-            initial_outbreak_size_virus_2=1,
-            virus_0_spread_chance=1,
-            virus_1_spread_chance=1,
-            virus_2_spread_chance=1,
-            virus_0_check_frequency=0.4,
-            virus_1_check_frequency=0.4,
-            virus_2_check_frequency=0.4,
-            exposed_chance_virus_0=1,
-            exposed_chance_virus_1=1,
-            exposed_chance_virus_2=1,
-            gain_skeptical_chance_virus_0=0.5,
-            gain_skeptical_chance_virus_1=0.5,
-            gain_skeptical_chance_virus_2=0.5,
-            skeptical_level_virus_0=0,
-            skeptical_level_virus_1=0,
-            skeptical_level_virus_2=0,
-    ):
-        self.misinformation = {0: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': 1,
-                                   'infected_list': [], 'num_virus': 1},
-                               1: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': 0,
-                                   },
-                               2: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': None,
-                                   }}
-
-        # print("debug: ", self.misinformation)
-        # header = ['number infected', ' number susceptible', ' number skeptical', ' number exposed']
-        # with open('results_test.csv', 'w', newline='') as f:
-        # writer = csv.writer(f)
-        # writer.writerow({'Batch: test'})
-        # writer.writerow({'Total Agents: ', num_nodes})
-        # writer.writerow({'Spread Chance Virus 1: ', virus_1_spread_chance})
-        # writer.writerow({'Spread Chance Virus 2: ', virus_2_spread_chance})
-        # writer.writerow({'Exposed Chance Virus 1: ', exposed_chance_virus_1})
-        # writer.writerow({'Exposed Chance Virus 2: ', exposed_chance_virus_2})
-        # writer.writerow({'Node Degree: ', avg_node_degree})
-        # writer.writerow({'Initial Outbreak Size Virus 1: ', initial_outbreak_size_virus_1})
-        # writer.writerow({'Initial Outbreak Size Virus 2: ', initial_outbreak_size_virus_2})
-        # print("Number of Agents: ", num_nodes)
-        # print("Skeptical_level: ", skeptical_level)
-        # print("virus spread chance: ", virus_spread_chance)
-        # print("exposed chance: ", exposed_chance)
-        # writer.writerow(header)
-
-        self.step_number = 0
-        self.num_nodes = num_nodes
-        prob = avg_node_degree / self.num_nodes
-        
-        self.G = nx.erdos_renyi_graph(n=self.num_nodes, p=prob, directed=True)
-        
-        self.grid = mesa.space.NetworkGrid(self.G)
-        self.schedule = mesa.time.RandomActivation(self)
-        self.j = j
-        self.virus = virus
-        self.initial_outbreak_size_virus_0 = initial_outbreak_size_virus_0
-        self.misinformation[0]['initial_outbreak_size'] = (
-            initial_outbreak_size_virus_0 if initial_outbreak_size_virus_0 <= num_nodes else num_nodes
-        )
-        self.initial_outbreak_size_virus_1 = initial_outbreak_size_virus_1
-        self.misinformation[1]['initial_outbreak_size'] = (
-            initial_outbreak_size_virus_1 if initial_outbreak_size_virus_1 <= num_nodes else num_nodes
-        )
-        self.initial_outbreak_size_virus_2 = initial_outbreak_size_virus_2
-        self.misinformation[2]['initial_outbreak_size'] = (
-            initial_outbreak_size_virus_2 if initial_outbreak_size_virus_2 <= num_nodes else num_nodes
-        )
-        self.misinformation[0]['num_virus'] = j
-        self.virus_0_spread_chance = virus_0_spread_chance
-        self.misinformation[0]['spread_chance'] = virus_0_spread_chance
-        self.virus_1_spread_chance = virus_1_spread_chance
-        self.misinformation[1]['spread_chance'] = virus_1_spread_chance
-        self.virus_2_spread_chance = virus_2_spread_chance
-        self.misinformation[2]['spread_chance'] = virus_2_spread_chance
-        self.virus_0_check_frequency = virus_0_check_frequency
-        self.misinformation[0]['virus_check_frequency'] = virus_0_check_frequency
-        self.virus_1_check_frequency = virus_1_check_frequency
-        self.misinformation[1]['virus_check_frequency'] = virus_1_check_frequency
-        self.virus_2_check_frequency = virus_2_check_frequency
-        self.misinformation[2]['virus_check_frequency'] = virus_2_check_frequency
-        self.exposed_chance_virus_0 = exposed_chance_virus_0
-        self.misinformation[0]['exposed_chance'] = exposed_chance_virus_0
-        self.exposed_chance_virus_1 = exposed_chance_virus_1
-        self.misinformation[1]['exposed_chance'] = exposed_chance_virus_1
-        self.exposed_chance_virus_2 = exposed_chance_virus_2
-        self.misinformation[2]['exposed_chance'] = exposed_chance_virus_2
-        self.gain_skeptical_chance_virus_0 = gain_skeptical_chance_virus_0
-        self.misinformation[0]['gain_skeptical_chance'] = gain_skeptical_chance_virus_0
-        self.gain_skeptical_chance_virus_1 = gain_skeptical_chance_virus_1
-        self.misinformation[1]['gain_skeptical_chance'] = gain_skeptical_chance_virus_1
-        self.gain_skeptical_chance_virus_2 = gain_skeptical_chance_virus_2
-        self.misinformation[2]['gain_skeptical_chance'] = gain_skeptical_chance_virus_2
-        self.skeptical_level_virus_0 = skeptical_level_virus_0
-        self.misinformation[0]['skeptical_level'] = skeptical_level_virus_0
-        self.skeptical_level_virus_1 = skeptical_level_virus_1
-        self.misinformation[1]['skeptical_level'] = skeptical_level_virus_1
-        self.skeptical_level_virus_2 = skeptical_level_virus_2
-        self.misinformation[2]['skeptical_level'] = skeptical_level_virus_2
+    ENGINES = ("agents", "vectorized", "events")
+
+    def create_agents(self):
+        # only the agent engine walks a networkx graph
+        self.G = self.network.to_networkx() if self.engine == "agents" else None
+        self.grid = mesa.space.NetworkGrid(self.G) if self.engine == "agents" else None
+        self.schedule = FrontierActivation(self) if self.activation == "frontier" else mesa.time.RandomActivation(self)
         self.datacollector = mesa.DataCollector(
             {
                 # "Infected": number_infected,
@@ -160,393 +65,178 @@ class VirusOnNetwork(mesa.Model):
                 # Skeptical': number_skeptical,
             }
         )
+        if self.profiler.enabled:
+            # the record of the step that was just collected
+            self.datacollector.model_reporters['Profile'] = lambda m: m.profiler.last
+            self.datacollector.model_vars['Profile'] = []
 
         # Create agents
-        for i, node in enumerate(self.G.nodes()):
-            a = VirusAgent(
-                i,
-                self,
-                self.G,
-                self.j,
-                self.virus,
-                self.initial_outbreak_size_virus_0,
-                self.initial_outbreak_size_virus_1,
-                self.initial_outbreak_size_virus_2,
-                self.virus_0_spread_chance,
-                self.virus_1_spread_chance,
-                self.virus_2_spread_chance,
-                self.virus_0_check_frequency,
-                self.virus_1_check_frequency,
-                self.virus_2_check_frequency,
-                self.exposed_chance_virus_0,
-                self.exposed_chance_virus_1,
-                self.exposed_chance_virus_2,
-                self.gain_skeptical_chance_virus_0,
-                self.gain_skeptical_chance_virus_1,
-                self.gain_skeptical_chance_virus_2,
-                self.skeptical_level_virus_0,
-                self.skeptical_level_virus_1,
-                self.skeptical_level_virus_2,
-            )
+        for i, node in enumerate(self.G.nodes() if self.engine == "agents" else []):
+            a = VirusAgent(i, self)
             self.schedule.add(a)
             # Add the agent to the node
             self.grid.place_agent(a, node)
-        self.running = True
+
+    def collect(self):
         self.datacollector.collect(self)
 
-        def create_bidirectional_edges(G):
-            edge_tuple_list=[]
-            for edge in G.edges:
-                x=str(edge)
-                x=x[1:]
-                x=x[:-1]
-                a=x.split(',')[0]
-                b=x.split(',')[-1]
-                if G.has_edge(int(b), int(a)) is False:
-                    edge_tuple_list.append((int(b), int(a)))
-            print("number of edges added")
-            print(len(edge_tuple_list))
-            G.add_edges_from(edge_tuple_list)
-
-        with open('weighted_edgelist.csv', 'w') as f:
-            def create_bidirectional_edge_weights(G):
-                weighted_list = []
-                #print("weighted list")          
-                for edge in G.edges:
-                    #print(len(G.edges))
-                    #print((G.edges))
-                    x=str(edge)
-                    x=x[1:]
-                    x=x[:-1]
-                    a=x.split(',')[0]
-                    b=x.split(',')[-1]
-                    G[int(a)][int(b)]['weight'] = np.random.rand()
-                    if (int(a), int(b)) not in weighted_list:
-                        weighted_list.append((int(a), int(b)))
-                    
-                    with open('weighted_edgelist.csv', 'a') as f:
-                        f.write(str(edge))
-                        f.write(',')
-                        f.write(str(G[int(a)][int(b)]['weight']))                       
-                        f.write(',\n')
-                   
-                print("length of weighted edge list")
-                print(len(weighted_list))    
-
-        print("\nNumber of Edges pre bidirectional")
-        print(self.G.number_of_edges())                    
-        create_bidirectional_edges(self.G)
-        create_bidirectional_edge_weights(self.G)
-        print("Number of Edges")
-        print(self.G.number_of_edges())
-        
-        with open('edgelist.csv', 'w') as f:
-            print("edge list without weights")
-            for i in self.G.edges:
-                #print(i)
-                f.write('|')
-                g=0
-                for u in i:
-                    g=g+1
-                    #print(u)
-                    f.write(str(u))
-                    if (g%2) != 0:
-                        f.write(',')
-            f.write('|')
-
-        with open('centrality.csv', 'w') as f:
-            f.write('Node: Degree Centrality\n')
-            f.write(str(nx.degree_centrality(self.G)))
-            #print(nx.degree_centrality(self.G))
-            f.write('\nNode: Betweenness Centrality\n')
-            f.write(str(nx.betweenness_centrality(self.G)))
-            #print(nx.betweenness_centrality(self.G))
-
-        # Infect some nodes
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                
-                infected_nodes = self.random.sample(list(self.G), self.misinformation[i]['initial_outbreak_size'])
-                # print(infected_nodes)
-                for a in self.grid.get_cell_list_contents(infected_nodes):
-                    # print(a.unique_id)
-                    # print(a.misinformation)
-                    a.misinformation[i]['infected'] = 'yes'
-                    a.misinformation[i]['exposed'] = 'yes'
-                    a.misinformation[0]['infected_list'].append(i)
-                    #print(a.misinformation)
-                    if a.misinformation[i]['opposite_virus'] is not None:
-                        a.misinformation[a.misinformation[i]['opposite_virus']]['skeptical_level'] = .90
-                        a.misinformation[a.misinformation[i]['opposite_virus']]['infected'] = 'no'
-
-        # Gives every node in the graph a level of skepticism
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                skeptics = self.random.sample(list(self.G), self.num_nodes)
-                f = 0
-                for a in self.grid.get_cell_list_contents(skeptics):
-                    if f <= (int(len(skeptics) * .25)):
-                        a.misinformation[i]['skeptical_level'] = .20
-                        f += 1
-                    elif (int(len(skeptics) * .25)) < f <= (int(len(skeptics) * .50)):
-                        a.misinformation[i]['skeptical_level'] = .40
-                        f += 1
-                    elif (int(len(skeptics) * .50)) < f <= (int(len(skeptics) * .75)):
-                        a.misinformation[i]['skeptical_level'] = .60
-                        f += 1
-                    elif (int(len(skeptics) * .75)) < f <= (int(len(skeptics))):
-                        a.misinformation[i]['skeptical_level'] = .80
-                        f += 1
-
-    def infected_nodes(self, i):
-        infected_nodes = {0: [], 1: [], 2: []}
-        for a in self.grid.get_cell_list_contents(self.G.nodes):
-            if a.misinformation[i]['infected'] == 'yes':
-                infected_nodes[i].append(a.unique_id)
-        return infected_nodes[i]
-
-    def exposed_nodes(self, i):
-        exposed_nodes = {0: [], 1: [], 2: []}
-        for a in self.grid.get_cell_list_contents(self.G.nodes):
-            if a.misinformation[i]['exposed'] == 'yes' and a.misinformation[i]['infected'] == 'no':
-                exposed_nodes[i].append(a.unique_id)
-        return exposed_nodes[i]
-
-    def not_infected_or_exposed_nodes(self, i):
-        not_infected_or_exposed_nodes = {0: [], 1:[], 2: []}
-        for a in self.grid.get_cell_list_contents(self.G.nodes):
-            if a.misinformation[i]['infected'] == 'no' and a.misinformation[i]['exposed'] == 'no':
-                not_infected_or_exposed_nodes[i].append(a.unique_id)
-        return not_infected_or_exposed_nodes[i]
-
-    with open('infected.csv', 'w') as f:
-        f.write('Step, Virus, [Infected Nodes]\n')
-        with open('exposed.csv', 'w') as e:
-            e.write('Step, Virus, [Exposed Nodes]\n')
-            with open('not_infected_or_exposed.csv', 'w') as n: 
-                n.write('Step, Virus, [Not Infected or Exposed Nodes]\n')
-                with open('dictionary.csv', 'w') as d:
-
-                    def step(self):
-                        self.schedule.step()
-                        # collect data
-                        self.datacollector.collect(self)
-                        self.step_number = self.step_number + 1
-                        #print('\n[step',self.step_number,']')
-                        #print(self.G.nodes)
-                        #print(self.misinformation)
-                        #print(self.G.edges)
-                        #print(today, current_time)
-                        with open('dictionary.csv', 'a') as d:
-                            d.write(str(self.step_number))
-                            d.write('\n')
-                        for i in self.grid.get_cell_list_contents(self.G.nodes):
-                            
-                            #print(i.unique_id)
-                            #print(i.misinformation)
-                            with open('dictionary.csv', 'a') as d:
-                                d.write('|')
-                                d.write(str(i.unique_id))
-                                d.write(str(i.misinformation))
-                                d.write('|')
-                                d.write('\n')
-
-                        for i in self.misinformation:
-                            if i < self.misinformation[0]['num_virus']:
-                                #print("List of infected nodes for virus", i, ": ", self.infected_nodes(i))
-                                
-                                with open('infected.csv', 'a') as f:
-                                    
-                                    f.write(str(self.step_number))
-                                    f.write(', ')
-                                    f.write(str(i))
-                                    f.write(', ')
-                                    f.write(str(self.infected_nodes(i)))
-                                    f.write(',\n')
-
-                        for i in self.misinformation:
-                            if i < self.misinformation[0]['num_virus']:
-                                #print("List of exposed nodes for virus", i, ": ", self.exposed_nodes(i))
-                                
-                                with open('exposed.csv', 'a') as e:
-                                    
-                                    e.write(str(self.step_number))
-                                    e.write(', ')
-                                    e.write(str(i))
-                                    e.write(', ')
-                                    e.write(str(self.exposed_nodes(i)))
-                                    e.write(',\n')
-
-
-                        for i in self.misinformation:
-                            if i < self.misinformation[0]['num_virus']:
-                                
-                                with open('not_infected_or_exposed.csv', 'a') as n:
-                                    
-                                    n.write(str(self.step_number))
-                                    n.write(', ')
-                                    n.write(str(i))
-                                    n.write(', ')
-                                    n.write(str(self.not_infected_or_exposed_nodes(i)))
-                                    n.write(',\n')
-
-    def run_model(self, n):
-        for i in range(n):
-            self.step()
-
-class VirusAgent(mesa.Agent, VirusOnNetwork):
-
-    def __init__(
-            self,
-            unique_id,
-            model,
-            VirusOnNetwork,
-            j,
-            virus,
-            initial_outbreak_size_virus_0,
-            initial_outbreak_size_virus_1,
-            initial_outbreak_size_virus_2,
-            virus_0_spread_chance,
-            virus_1_spread_chance,
-            virus_2_spread_chance,
-            virus_0_check_frequency,
-            virus_1_check_frequency,
-            virus_2_check_frequency,
-            exposed_chance_virus_0,
-            exposed_chance_virus_1,
-            exposed_chance_virus_2,
-            gain_skeptical_chance_virus_0,
-            gain_skeptical_chance_virus_1,
-            gain_skeptical_chance_virus_2,
-            skeptical_level_virus_0,
-            skeptical_level_virus_1,
-            skeptical_level_virus_2,
-    ):
+    def step_engine(self):
+        if self.engine != "agents":
+            super().step_engine()
+        else:
+            self.schedule.step()
+            self.profiler.count('agents_activated', self.schedule.stepped if self.activation == "frontier" else len(self.schedule.agents))
+
+
+class FrontierActivation(mesa.time.RandomActivation):
+    """RandomActivation that only steps the agents on the active frontier.
 
+    model.active holds the nodes that can still change state, kept up to
+    date by the model after every step (see frontier.active_nodes), so a
+    step costs the size of the outbreak instead of the number of nodes.
+    Agents are looked up by node, create_agents gives agent i node i.
+
+    Every agent gets a uniform random turn in the step, the active ones up
+    front and any other one once a change of state next to it may have
+    woken it up. A woken agent whose turn is still to come is stepped in
+    this step, so the order is that of RandomActivation and only agents
+    that can do nothing are left out.
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.stepped = 0
+        self._reverse = None
+
+    def step(self):
+        model = self.model
+        if self._reverse is None:
+            graph = model.network
+            # agents act on their out neighbors, a change wakes its in neighbors
+            self._reverse = CSRGraph.from_edges(graph.num_nodes, graph.indices, graph.sources(), graph.weights)
+        turns = {}
+        queue = []
+        for node in model.active.tolist():
+            turns[node] = model.random.random()
+            queue.append((turns[node], node))
+        heapq.heapify(queue)
+        now = 0.0
+
+        def wake(i, node):
+            indptr = self._reverse.indptr
+            for woken in [node] + self._reverse.indices[indptr[node]:indptr[node + 1]].tolist():
+                if woken not in turns:
+                    turns[woken] = model.random.random()
+                    if turns[woken] > now:
+                        heapq.heappush(queue, (turns[woken], woken))
+
+        self.stepped = 0
+        model.state.on_change = wake
+        try:
+            while queue:
+                now, node = heapq.heappop(queue)
+                self._agents[node].step()
+                self.stepped += 1
+        finally:
+            model.state.on_change = None
+        self.steps += 1
+        self.time += 1
+
+
+class VirusAgent(mesa.Agent):
+
+    def __init__(self, unique_id, model):
         super().__init__(unique_id, model)
-        self.misinformation = {0: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': 1,
-                                   'infected_list': [], 'num_virus': 1},
-                               1: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': 0,
-                                   },
-                               2: {'infected': 'no', 'exposed': 'no', 'initial_outbreak_size': 1, 'spread_chance': 1, 'exposed_chance': 1, 'skeptical_level': 0, 'virus_check_frequency': 0, 'gain_skeptical_chance': 1, 'opposite_virus': None,
-                                   }}
-        #self.G = nx.erdos_renyi_graph(n=self.num_nodes, p=prob, directed=True)
-       
-        self.step_number = 0
-        self.virus = virus
-        self.G=VirusOnNetwork
-        self.misinformation[0]['num_virus'] = j
-        self.misinformation[0]['initial_outbreak_size'] = initial_outbreak_size_virus_0
-        self.misinformation[1]['initial_outbreak_size'] = initial_outbreak_size_virus_1
-        self.misinformation[2]['initial_outbreak_size'] = initial_outbreak_size_virus_2
-        self.misinformation[0]['virus_check_frequency'] = virus_0_check_frequency
-        self.misinformation[1]['virus_check_frequency'] = virus_1_check_frequency
-        self.misinformation[2]['virus_check_frequency'] = virus_2_check_frequency
-        self.misinformation[0]['spread_chance'] = virus_0_spread_chance
-        self.misinformation[1]['spread_chance'] = virus_1_spread_chance
-        self.misinformation[2]['spread_chance'] = virus_2_spread_chance
-        self.misinformation[0]['exposed_chance'] = exposed_chance_virus_0
-        self.misinformation[1]['exposed_chance'] = exposed_chance_virus_1
-        self.misinformation[2]['exposed_chance'] = exposed_chance_virus_2
-        self.misinformation[0]['gain_skeptical_chance'] = gain_skeptical_chance_virus_0
-        self.misinformation[1]['gain_skeptical_chance'] = gain_skeptical_chance_virus_1
-        self.misinformation[2]['gain_skeptical_chance'] = gain_skeptical_chance_virus_2
-        self.misinformation[0]['skeptical_level'] = skeptical_level_virus_0
-        self.misinformation[1]['skeptical_level'] = skeptical_level_virus_1
-        self.misinformation[2]['skeptical_level'] = skeptical_level_virus_2
-     
+
+    @property
+    def misinformation(self):
+        # compatibility view onto model.state, nothing is stored on the agent
+        return AgentMisinformation(self.model, self.pos)
+
+    @property
+    def virus(self):
+        return self.model.virus
+
     def edge_test(self, node1, node2):
         #print(self.G[node1][node2]['weight'])
-        print(self.G[0])
+        log.debug("%s", self.model.G[0])
         #for a in self.neighbors(0):
             #print(self.G.get_edge_data(0,a))
 
     def try_exposing(self, i):
         # Try to expose
+        state = self.model.state
         neighbors_nodes = self.model.grid.get_neighbors(self.pos, include_center=True)
+        self.model.profiler.count('neighbor_checks', len(neighbors_nodes))
         susceptible_neighbors = [
-            agent
-            for agent in self.model.grid.get_cell_list_contents(neighbors_nodes)
-            if agent.misinformation[i]['exposed'] == 'no' and agent.misinformation[i]['infected'] == 'no'
+            node
+            for node in neighbors_nodes
+            if state.codes[i, node] == State.SUSCEPTIBLE
         ]
-        for a in susceptible_neighbors:
-            if self.random.random() < self.misinformation[i]['skeptical_level']:#*VirusOnNetwork.G:
-                a.misinformation[i]['exposed'] = 'yes'
-
-    with open('infected_by.csv', 'w') as f:
-        f.write('node, infected by, node number, with virus, virus number, infected by, node number, with virus, virus number, infected by, node number, with virus, virus number, infected by, node number, with virus, virus number, infected by, node number, with virus, virus number\n\n')
-
-        def try_to_infect_neighbors(self, i):
-            self.step_number += 1
-            neighbors_nodes = self.model.grid.get_neighbors(self.pos, include_center=True)
-            exposed_neighbors = [
-                agent
-                for agent in self.model.grid.get_cell_list_contents(neighbors_nodes)
-                if agent.misinformation[i]['exposed'] == 'yes' and agent.misinformation[i]['infected'] == 'no'
-            ]
+        for node in susceptible_neighbors:
+            if self.model.uniforms.random() < state.skeptical_level[i, self.pos]:#*VirusOnNetwork.G:
+                state.set_code(i, node, State.EXPOSED)
+                self.model.profiler.count('exposures')
+
+    def try_to_infect_neighbors(self, i):
+        state = self.model.state
+        spread_chance = self.model.viruses.spread_chance[i]
+        neighbors_nodes = self.model.grid.get_neighbors(self.pos, include_center=True)
+        self.model.profiler.count('neighbor_checks', len(neighbors_nodes))
+        exposed_neighbors = [
+            node
+            for node in neighbors_nodes
+            if state.codes[i, node] == State.EXPOSED
+        ]
+        # checked once per call, so the messages cost nothing unless enabled
+        debug = log.isEnabledFor(logging.DEBUG)
+        
+        for node in exposed_neighbors:
             
-            for a in exposed_neighbors:
-                
-                #print(self.misinformation[i]['spread_chance'])
-                #print(a.pos)
-                #self.edge_test(i,a)
-                #print((self.G.get_edge_data(i,a)))
-                print("Spread chance without multiplying weight", self.misinformation[i]['spread_chance'])
-                if self.random.random() < self.misinformation[i]['spread_chance']*self.G[self.pos][a.pos]['weight']:
-                    print("Spread chance while multiplying weight", (self.misinformation[i]['spread_chance']*self.G[self.pos][a.pos]['weight']))
-                    if self.random.random() > self.misinformation[i]['skeptical_level']:
-                        a.misinformation[i]['infected'] = 'yes'
-                        a.misinformation[0]['infected_list'].append(("infected by node:", self.pos, "with virus", i))
-                        print()
-                        print(a.unique_id, a.misinformation[0]['infected_list'])
-                        
-                        with open('infected_by.csv', 'a') as f:
-                            #f.write("Step ")
-                            #f.write(str(self.step_number))
-                            #f.write('\n')
-                            f.write(str(a.unique_id))
-                            f.write(', ')
-                            f.write(str(a.misinformation[0]['infected_list']))
-                            f.write('\n\n')
-                                
-                        a.misinformation[i]['exposed'] = 'no'
-                        if a.misinformation[i]['opposite_virus'] is not None:
-                            a.misinformation[a.misinformation[i]['opposite_virus']]['skeptical_level'] = .90
-                            if a.misinformation[a.misinformation[i]['opposite_virus']]['infected'] == 'yes':
-                                a.misinformation[a.misinformation[i]['opposite_virus']]['infected'] = 'no'
-                        
+            #print(self.misinformation[i]['spread_chance'])
+            #print(a.pos)
+            #self.edge_test(i,a)
+            #print((self.G.get_edge_data(i,a)))
+            if debug:
+                log.debug("Spread chance without multiplying weight %s", spread_chance)
+            if self.model.uniforms.random() < spread_chance*self.model.G[self.pos][node]['weight']:
+                if debug:
+                    log.debug("Spread chance while multiplying weight %s", spread_chance*self.model.G[self.pos][node]['weight'])
+                if self.model.uniforms.random() > state.skeptical_level[i, self.pos]:
+                    state.set_code(i, node, State.INFECTED)
+                    # step_number is only advanced once the step is done
+                    self.model.transmissions.record(self.model.step_number + 1, self.pos, node, i)
+                    self.model.profiler.count('infections')
+                    if debug:
+                        log.debug("%s %s", node, ("infected by node:", self.pos, "with virus", i))
+                    
+                    for other, level in self.model.viruses.suppresses[i]:
+                        state.skeptical_level[other, node] = level
+                        state.set_code(other, node, state.codes[other, node] & ~int(State.INFECTED))
+                    
     def try_gain_skeptical(self, i):
-        if self.random.random() < self.misinformation[i]['gain_skeptical_chance']:
-            if self.misinformation[i]['skeptical_level'] < .91:
-                self.misinformation[i]['skeptical_level'] = self.misinformation[i]['skeptical_level'] + .10
+        state = self.model.state
+        if self.model.uniforms.random() < self.model.viruses.gain_skeptical_chance[i]:
+            if state.skeptical_level[i, self.pos] < .91:
+                state.skeptical_level[i, self.pos] = state.skeptical_level[i, self.pos] + .10
             else:
-                self.misinformation[i]['skeptical_level'] = 1
+                state.skeptical_level[i, self.pos] = 1
 
     def try_check_situation(self, i):
-        if self.random.random() < self.misinformation[i]['virus_check_frequency']:
+        if self.model.uniforms.random() < self.model.viruses.virus_check_frequency[i]:
             # Checking...
-            if self.misinformation[i]['infected'] == 'yes':
+            if self.model.state.is_infected(i, self.pos):
                 self.try_to_infect_neighbors(i)
-        elif self.misinformation[i]['exposed'] == 'yes':
+        elif self.model.state.is_exposed(i, self.pos):
             self.try_gain_skeptical(i)
 
     def step(self):
-        self.step_number = self.step_number + 1
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                if self.misinformation[i]['infected'] == 'yes':
-                    self.try_exposing(i)
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                self.try_check_situation(i)
+        for i in range(self.model.num_virus):
+            if self.model.state.is_infected(i, self.pos):
+                self.try_exposing(i)
+        for i in range(self.model.num_virus):
+            self.try_check_situation(i)
     
     def step2(self):
-
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                if self.misinformation[i]['infected'] == 'yes':
-                    self.try_exposing(i)
-        for i in self.misinformation:
-            if i < self.misinformation[0]['num_virus']:
-                self.try_check_situation(i)
+        self.step()
     
@@ -0,0 +1,256 @@
+import math
+import os
+import weakref
+
+import numpy as np
+import tornado.web
+from mesa.visualization.ModularVisualization import D3_JS_FILE, VisualizationElement
+
+from .graph import _sorted_unique
+from .state import COMPARTMENT, EXPOSED, INFECTED, AgentMisinformation, State
+
+# node color of the first virus a node is infected with, None when it has none
+VIRUS_COLORS = ["#ff0000", "#00ff00", "#0000ff"]
+# edge between two nodes that are fully skeptical of virus 0 and 1, and any other edge
+SKEPTICAL_EDGE = ("#000000", 3)
+EDGE = ("#e8e8e8", 2)
+# supernode color of a cluster that is fully susceptible
+SUSCEPTIBLE_RGB = np.array([200, 200, 200])
+VIRUS_RGB = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255]])
+
+
+def node_colors(model):
+    """Index into VIRUS_COLORS of every node, -1 for no color"""
+    num_virus = min(model.num_virus, len(VIRUS_COLORS))
+    infected = (model.state.codes[:num_virus] & State.INFECTED) != 0
+    colors = np.argmax(infected, axis=0).astype(np.int8) if num_virus else np.zeros(model.num_nodes, np.int8)
+    colors[~infected.any(axis=0)] = -1
+    return colors
+
+
+def skeptical_edges(model, src, dst):
+    """Whether every edge gets the SKEPTICAL_EDGE style"""
+    levels = model.state.skeptical_level[:2]
+    if not len(levels):
+        return np.zeros(len(src), dtype=bool)
+    full = (levels == 1).all(axis=0)
+    return full[src] & full[dst]
+
+
+def tooltip(model, node):
+    misinformation = AgentMisinformation(model, node)
+    return f"id: {node}<br>state: " + "".join(f"<br> Virus {i}: {misinformation[i]}" for i in misinformation)
+
+
+def bfs_order(graph):
+    """Nodes in breadth first order from node 0, then every node it did not reach"""
+    visited = np.zeros(graph.num_nodes, dtype=bool)
+    order = []
+    frontier = np.zeros(min(graph.num_nodes, 1), dtype=np.int64)
+    visited[frontier] = True
+    while len(frontier):
+        order.append(frontier)
+        reached = _sorted_unique(graph.indices[graph.out_edges(frontier)])
+        frontier = reached[~visited[reached]]
+        visited[frontier] = True
+    order.append(np.flatnonzero(~visited))
+    return np.concatenate(order)
+
+
+class Supernodes:
+    """The nodes of a graph grouped into at most num_clusters clusters.
+
+    Clusters are consecutive runs of a breadth first order, so neighbors
+    mostly share a cluster. edges holds (a, b, count) of the max_edges
+    pairs of clusters with the most edges between them.
+    """
+
+    def __init__(self, graph, num_clusters, max_edges):
+        self.graph = graph
+        order = bfs_order(graph)
+        per_cluster = math.ceil(graph.num_nodes / num_clusters)
+        self.cluster = np.empty(graph.num_nodes, dtype=np.int64)
+        self.cluster[order] = np.arange(graph.num_nodes) // per_cluster
+        self.num_clusters = int(self.cluster.max()) + 1 if graph.num_nodes else 0
+        self.sizes = np.bincount(self.cluster, minlength=self.num_clusters)
+
+        src, dst = graph.edges()
+        a, b = self.cluster[src], self.cluster[dst]
+        between = a < b
+        keys = np.sort(a[between] * self.num_clusters + b[between])
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, np.int64)
+        counts = np.diff(np.r_[starts, len(keys)])
+        keep = np.argsort(-counts, kind='stable')[:max_edges]
+        self.edges = keys[starts[keep]] // self.num_clusters, keys[starts[keep]] % self.num_clusters, counts[keep]
+
+    def shares(self, model):
+        """(virus, compartment, cluster) share of the nodes of each cluster"""
+        num_virus = min(model.num_virus, len(VIRUS_RGB))
+        shares = np.zeros((num_virus, 3, self.num_clusters))
+        for i in range(num_virus):
+            compartment = COMPARTMENT[model.state.codes[i]]
+            for c in (EXPOSED, INFECTED):
+                shares[i, c] = np.bincount(self.cluster, weights=compartment == c, minlength=self.num_clusters)
+        shares /= np.maximum(self.sizes, 1)
+        shares[:, 0] = 1 - shares[:, 1] - shares[:, 2]
+        return shares
+
+    def colors(self, model):
+        """Color of every cluster as 0xRRGGBB, a blend of the virus colors by infected share"""
+        infected = self.shares(model)[:, INFECTED]
+        # a node infected by several viruses would push the share over 1
+        total = infected.sum(axis=0)
+        blend = infected.T @ VIRUS_RGB[:len(infected)] / np.maximum(total, 1)[:, None]
+        rgb = np.rint((1 - np.minimum(total, 1))[:, None] * SUSCEPTIBLE_RGB + blend).astype(np.int64)
+        return rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2]
+
+
+class _Drawn:
+    # what one connection was last sent
+    __slots__ = ('model', 'colors', 'edge_styles')
+
+    def __init__(self):
+        self.model = None
+        self.colors = None
+        self.edge_styles = None
+
+
+class DeltaNetworkModule(VisualizationElement):
+    """Network view that sends the topology once and then only what changed.
+
+    The first frame of a model is {"type": "full"} with every node and every
+    undirected edge. Later frames are {"type": "delta"} with [node, color]
+    for nodes whose color changed and [edge, color, width] for edges whose
+    style changed. Tooltips are fetched from /tooltip/<node> when a node is
+    hovered, see add_tooltip_handler. Works with either engine since it
+    reads model.network and model.state instead of the networkx graph.
+
+    Networks with more than max_nodes nodes are drawn as at most max_nodes
+    Supernodes, colored by the share of their nodes infected by each virus
+    and joined by the max_edges busiest links, so a frame never holds more
+    than that. The clusters of a network are computed once and kept for
+    every model that uses the same network.
+
+    Deltas are against the last frame of the connection that asks, so
+    render(model, client) keeps what every client (e.g. the SocketHandler
+    of a browser tab, see BackgroundServer.render_model) was sent and a new
+    client or a new model gets a full frame first. Without client all
+    renders share one history, fine for a single tab.
+    """
+
+    # render takes the client it renders for
+    per_client = True
+
+    package_includes = [D3_JS_FILE]
+    local_includes = ["DeltaNetworkModule.js"]
+    local_dir = os.path.join(os.path.dirname(__file__), "js")
+
+    def __init__(self, canvas_height=500, canvas_width=500, max_nodes=1000, max_edges=3000):
+        self.canvas_height = canvas_height
+        self.canvas_width = canvas_width
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.js_code = f"elements.push(new DeltaNetworkModule({canvas_width}, {canvas_height}));"
+        self.drawn = _Drawn()
+        self.clients = weakref.WeakKeyDictionary()
+        self.supernodes = None
+
+    def large(self, model):
+        return model.num_nodes > self.max_nodes
+
+    def drawn_for(self, client):
+        if client is None:
+            return self.drawn
+        return self.clients.setdefault(client, _Drawn())
+
+    def forget(self, client):
+        self.clients.pop(client, None)
+
+    def render(self, model, client=None):
+        drawn = self.drawn_for(client)
+        if self.large(model):
+            return self.render_supernodes(model, drawn)
+        src, dst = model.network.edges()
+        # both directions of an edge are drawn on top of each other, send one
+        once = src < dst
+        src, dst = src[once], dst[once]
+        colors = node_colors(model)
+        styles = skeptical_edges(model, src, dst)
+
+        if model is not drawn.model:
+            drawn.model = model
+            frame = {
+                "type": "full",
+                "nodes": [{"id": node, "size": 6, "color": VIRUS_COLORS[c] if c >= 0 else None}
+                          for node, c in enumerate(colors.tolist())],
+                "edges": [{"source": a, "target": b,
+                           "color": (SKEPTICAL_EDGE if s else EDGE)[0], "width": (SKEPTICAL_EDGE if s else EDGE)[1]}
+                          for a, b, s in zip(src.tolist(), dst.tolist(), styles.tolist())],
+            }
+        else:
+            nodes = np.flatnonzero(colors != drawn.colors)
+            edges = np.flatnonzero(styles != drawn.edge_styles)
+            frame = {
+                "type": "delta",
+                "nodes": [[node, VIRUS_COLORS[c] if c >= 0 else None]
+                          for node, c in zip(nodes.tolist(), colors[nodes].tolist())],
+                "edges": [[edge, *(SKEPTICAL_EDGE if s else EDGE)]
+                          for edge, s in zip(edges.tolist(), styles[edges].tolist())],
+            }
+        drawn.colors = colors
+        drawn.edge_styles = styles
+        return frame
+
+    def render_supernodes(self, model, drawn):
+        if self.supernodes is None or self.supernodes.graph is not model.network:
+            self.supernodes = Supernodes(model.network, self.max_nodes, self.max_edges)
+        supernodes = self.supernodes
+        colors = supernodes.colors(model)
+
+        if model is not drawn.model:
+            drawn.model = model
+            a, b, counts = supernodes.edges
+            frame = {
+                "type": "full",
+                "nodes": [{"id": k, "size": 3 + math.sqrt(size), "color": f"#{c:06x}"}
+                          for k, (size, c) in enumerate(zip(supernodes.sizes.tolist(), colors.tolist()))],
+                "edges": [{"source": x, "target": y, "color": EDGE[0], "width": 1 + math.log(n)}
+                          for x, y, n in zip(a.tolist(), b.tolist(), counts.tolist())],
+            }
+        else:
+            changed = np.flatnonzero(colors != drawn.colors)
+            frame = {
+                "type": "delta",
+                "nodes": [[k, f"#{c:06x}"] for k, c in zip(changed.tolist(), colors[changed].tolist())],
+                "edges": [],
+            }
+        drawn.colors = colors
+        return frame
+
+    def tooltip(self, model, node):
+        if not self.large(model):
+            return tooltip(model, node)
+        shares = self.supernodes.shares(model)
+        lines = [f"supernode {node}: {self.supernodes.sizes[node]} nodes"]
+        for i in range(len(shares)):
+            lines.append(f"Virus {i}: {shares[i, INFECTED, node]:.0%} infected, "
+                         f"{shares[i, EXPOSED, node]:.0%} exposed, {shares[i, 0, node]:.0%} susceptible")
+        return "<br>".join(lines)
+
+
+class TooltipHandler(tornado.web.RequestHandler):
+    def initialize(self, module):
+        self.module = module
+
+    def get(self, node):
+        model = self.application.model
+        node = int(node)
+        count = self.module.supernodes.num_clusters if self.module.large(model) else model.num_nodes
+        if not 0 <= node < count:
+            raise tornado.web.HTTPError(404)
+        self.write(self.module.tooltip(model, node))
+
+
+def add_tooltip_handler(server, module):
+    """Serve /tooltip/<node> of module from the server's current model"""
+    server.wildcard_router.add_rules([(r"/tooltip/(\d+)", TooltipHandler, {"module": module})])
@@ -0,0 +1,149 @@
+import os
+import weakref
+
+
+def _write_buffer(f, buffer):
+    if buffer:
+        # buffer holds either str or bytes chunks, join with the matching empty value
+        f.write(buffer[0][:0].join(buffer))
+        buffer.clear()
+
+
+def _flush_and_close(files, buffers):
+    for name, f in files.items():
+        _write_buffer(f, buffers[name])
+        f.close()
+    files.clear()
+
+
+def stream_name(name):
+    # infected_by.csv is the infected_by stream, states/codes.bin the states stream
+    return name.split('/')[0].rsplit('.', 1)[0]
+
+
+class Sink:
+    """Where the outputs of a run go.
+
+    Every output file belongs to a stream named after it without extension
+    (infected, exposed, not_infected_or_exposed, infected_by, edgelist,
+    weighted_edgelist, centrality, states). With streams given only those
+    are kept, streams in exclude are always dropped. The model asks wants()
+    before producing a stream, so a dropped stream costs nothing.
+    bytes_written counts what was kept (characters for text, all ASCII).
+    """
+
+    enabled = True
+
+    def __init__(self, streams=None, exclude=()):
+        self.streams = None if streams is None else set(streams)
+        self.exclude = set(exclude)
+        self.bytes_written = 0
+
+    def wants(self, name):
+        stream = stream_name(name)
+        return stream not in self.exclude and (self.streams is None or stream in self.streams)
+
+    def write(self, name, text):
+        if self.wants(name):
+            self.bytes_written += len(text)
+            self._append(name, text)
+
+    def write_bytes(self, name, data):
+        if self.wants(name):
+            self.bytes_written += len(data)
+            self._append(name, data)
+
+    def _append(self, name, data):
+        raise NotImplementedError
+
+    def end_step(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSystemSink(Sink):
+    """Log files of one run directory, each kept open and written in buffered chunks.
+
+    Writes are held in memory and flushed every flush_every steps or as soon
+    as more than flush_bytes are waiting, whichever comes first. A file is
+    created (and truncated) the first time something is written to it, names
+    may contain sub directories of the run directory.
+    """
+
+    def __init__(self, directory='.', flush_every=10, flush_bytes=1 << 22, streams=None, exclude=()):
+        super().__init__(streams, exclude)
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_bytes = flush_bytes
+        self.files = {}
+        self.buffers = {}
+        self.pending = 0
+        self.steps = 0
+        os.makedirs(directory, exist_ok=True)
+        # whatever is still buffered gets written when the sink goes away
+        self._finalizer = weakref.finalize(self, _flush_and_close, self.files, self.buffers)
+
+    def _open(self, name, mode):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.files[name] = open(path, mode)
+        self.buffers[name] = []
+
+    def _append(self, name, data):
+        if name not in self.files:
+            self._open(name, 'wb' if isinstance(data, bytes) else 'w')
+        self.buffers[name].append(data)
+        self.pending += len(data)
+        if self.pending >= self.flush_bytes:
+            self.flush()
+
+    def end_step(self):
+        self.steps += 1
+        if self.flush_every and self.steps % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        for name, f in self.files.items():
+            _write_buffer(f, self.buffers[name])
+            f.flush()
+        self.pending = 0
+
+    def close(self):
+        self._finalizer()
+
+
+# backward compatibility alias for scripts written against the old name
+OutputSink = FileSystemSink
+
+
+class MemorySink(Sink):
+    """Keeps every output in memory, for tests and notebooks"""
+
+    def __init__(self, streams=None, exclude=()):
+        super().__init__(streams, exclude)
+        self.buffers = {}
+
+    def _append(self, name, data):
+        self.buffers.setdefault(name, []).append(data)
+
+    def names(self):
+        return sorted(self.buffers)
+
+    def getvalue(self, name):
+        """Everything written to name so far, as str or bytes"""
+        buffer = self.buffers[name]
+        return buffer[0][:0].join(buffer)
+
+
+class NullSink(Sink):
+    """Drops everything, for benchmarks and sweeps that need no logs"""
+
+    enabled = False
+
+    def wants(self, name):
+        return False
@@ -0,0 +1,99 @@
+import contextlib
+import time
+from collections import defaultdict
+
+
+class _Phase:
+    # context manager adding its wall time to one phase of the profiler
+    __slots__ = ('times', 'name', 'start')
+
+    def __init__(self, times, name):
+        self.times = times
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.times[self.name] += time.perf_counter() - self.start
+
+
+class StepProfiler:
+    """Wall time per phase and counters of every step.
+
+    The model wraps each phase in `with profiler.phase(name)` and adds to
+    counters with count(). end_step() turns them into one record,
+    {'step', 'seconds', '<phase>_seconds', ..., '<counter>', ...}, which is
+    kept in history (unless keep is False), passed to callback and stays in
+    last until the next step. Phases may nest, a nested phase is also
+    counted in the phase around it.
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None, keep=True):
+        self.callback = callback
+        self.keep = keep
+        self.times = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.history = []
+        self.last = {}
+        self._start = time.perf_counter()
+
+    def begin_step(self):
+        self._start = time.perf_counter()
+
+    def phase(self, name):
+        return _Phase(self.times, name)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def end_step(self, step):
+        record = {'step': step, 'seconds': time.perf_counter() - self._start}
+        record.update((f'{name}_seconds', seconds) for name, seconds in self.times.items())
+        record.update(self.counters)
+        self.times.clear()
+        self.counters.clear()
+        self.last = record
+        if self.keep:
+            self.history.append(record)
+        if self.callback:
+            self.callback(record)
+        return record
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.history)
+
+
+class NullProfiler:
+    """Profiler that measures nothing, the default"""
+
+    enabled = False
+    last = {}
+    history = []
+    _phase = contextlib.nullcontext()
+
+    def begin_step(self):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def end_step(self, step):
+        pass
+
+
+def make_profiler(profile):
+    """Profiler for the profile argument of the model: a profiler, True, a callback or None"""
+    if not profile:
+        return NullProfiler()
+    if isinstance(profile, (StepProfiler, NullProfiler)):
+        return profile
+    if callable(profile):
+        return StepProfiler(callback=profile)
+    return StepProfiler()
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+
+# uniforms drawn per NumPy call by Uniforms
+BLOCK_SIZE = 4096
+
+
+class Uniforms:
+    """Uniform floats in [0, 1) from a Generator, drawn BLOCK_SIZE at a time.
+
+    random() is a drop-in for random.Random.random() in per agent code, one
+    NumPy call fills a block and every draw after that is a next() on it.
+    get_state() and set_state() include what is left of the block, so a
+    checkpoint continues with the same numbers.
+    """
+
+    def __init__(self, generator, block_size=BLOCK_SIZE):
+        self.generator = generator
+        self.block_size = block_size
+        self._block = iter(())
+
+    def random(self):
+        try:
+            return next(self._block)
+        except StopIteration:
+            self._block = iter(self.generator.random(self.block_size).tolist())
+            return next(self._block)
+
+    def get_state(self):
+        rest = list(self._block)
+        self._block = iter(rest)
+        return {'bit_generator': self.generator.bit_generator.state, 'rest': rest}
+
+    def set_state(self, state):
+        self.generator.bit_generator.state = state['bit_generator']
+        self._block = iter(list(state['rest']))
+
+
+class RandomStreams:
+    """Independent, reproducible random streams of one run.
+
+    Every stream is a child of one SeedSequence picked by name, so its
+    numbers only depend on the seed and the name, never on what the other
+    streams drew. seed=None draws fresh entropy, which is kept in entropy to
+    repeat the run. spawn() gives independent RandomStreams for replicates
+    or workers.
+    """
+
+    NAMES = ('graph', 'model', 'agents', 'vectorized', 'events', 'ensemble')
+
+    def __init__(self, seed=None):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+
+    @property
+    def entropy(self):
+        return self.seed_sequence.entropy
+
+    def _child(self, *key):
+        # named streams and spawned ones get keys of their own kind so they never meet
+        root = self.seed_sequence
+        return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + key, pool_size=root.pool_size)
+
+    def sequence(self, name):
+        return self._child(0, self.NAMES.index(name))
+
+    def generator(self, name):
+        return np.random.Generator(np.random.PCG64(self.sequence(name)))
+
+    def python_random(self, name):
+        """random.Random for code that needs its API, e.g. Mesa's schedulers"""
+        return random.Random(int.from_bytes(self.sequence(name).generate_state(4).tobytes(), 'little'))
+
+    def uniforms(self, name, block_size=BLOCK_SIZE):
+        return Uniforms(self.generator(name), block_size)
+
+    def spawn(self, n):
+        return [RandomStreams(self._child(1, k)) for k in range(n)]
+
+    def spawn_seeds(self, n):
+        """n independent integer seeds, for models that take seed=int"""
+        return [int(child.seed_sequence.generate_state(1, np.uint64)[0]) for child in self.spawn(n)]
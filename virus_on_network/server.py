@@ -3,22 +3,24 @@ import sys
 import mesa
 import socket
 import errno
+from .background import BackgroundControls, BackgroundServer
 from .model import VirusOnNetwork#, State#, number_infected
+from .network_module import DeltaNetworkModule, add_tooltip_handler
 
 
 def network_portrayal(G):
     # The model ensures there is always 1 agent per node
+    # full portrayal of every frame, the server uses DeltaNetworkModule instead
 
     def node_color(agent, virus):
         for i in agent.misinformation:
-            if i < agent.misinformation[0]['num_virus']:
-                if agent.misinformation[i]['infected'] == 'yes':
-                    if i == 0:
-                        return "#ff0000"
-                    if i == 1:
-                        return "#00ff00"
-                    if i == 2:
-                        return "#0000ff"
+            if agent.misinformation[i]['infected'] == 'yes':
+                if i == 0:
+                    return "#ff0000"
+                if i == 1:
+                    return "#00ff00"
+                if i == 2:
+                    return "#0000ff"
 
         '''if agent.misinformation[0]['exposed'] == 'no' and agent.misinformation[1]['exposed'] == 'no' and agent.misinformation[2]['exposed'] == 'no':
             return "#008000"
@@ -95,9 +97,7 @@ def network_portrayal(G):
             "tooltip": f"id: {agents[0].unique_id}<br>state: "
                        #f"{'exposed virus 1:', agents[0].misinformation[0]['exposed'],'infected virus 1:', agents[0].misinformation[0]['infected']}"
                        #f"{'exposed virus 2:', agents[0].misinformation[1]['exposed'],'infected virus 2:', agents[0].misinformation[1]['infected']}"
-                       f"<br> Virus 0: {agents[0].misinformation[0]}"
-                       f"<br> Virus 1: {agents[0].misinformation[1]}"
-                       f"<br> Virus 2: {agents[0].misinformation[2]}",
+                       + "".join(f"<br> Virus {i}: {agents[0].misinformation[i]}" for i in agents[0].misinformation),
         }
         for (_, agents) in G.nodes.data("agent")
     ]
@@ -115,7 +115,9 @@ def network_portrayal(G):
     return portrayal
 
 
-network = mesa.visualization.NetworkModule(network_portrayal, 750, 750)
+# sends the network once and then only the nodes and edges that changed,
+# above max_nodes nodes it draws supernodes instead
+network = DeltaNetworkModule(750, 750, max_nodes=1000)
 chart = mesa.visualization.ChartModule(
     [
         {"Label": "Susceptible", "Color": "#008000"},
@@ -154,9 +156,21 @@ model_params = {
         "Number of agents",
         50,   #starting value
         10,   #beginning value of scale
-        100,   #ending value of scale
-        1,   #interval by which scale is increased
-        description="Choose how many agents to include in the model",
+        100000,   #ending value of scale
+        10,   #interval by which scale is increased
+        description="Choose how many agents to include in the model, above 1000 they are drawn as supernodes",
+    ),
+    "engine": mesa.visualization.Choice(
+        "Engine",
+        value="agents",
+        choices=["agents", "vectorized", "events"],
+        description="vectorized steps large networks much faster, events is fastest when little happens per step",
+    ),
+    "activation": mesa.visualization.Choice(
+        "Activation",
+        value="random",
+        choices=["random", "frontier"],
+        description="frontier only steps agents that can still change state and stops once none can",
     ),
     "avg_node_degree": mesa.visualization.Slider(
         "Avg Node Degree", 3, 3, 8, 1, description="Avg Node Degree"
@@ -286,12 +300,14 @@ model_params = {
     ),
 }
 
-server = mesa.visualization.ModularServer(
+# the model steps in a background thread, the page only samples it
+server = BackgroundServer(
     VirusOnNetwork,
-    [network, chart], #need to add ", get_skeptical_susceptible_ratio" to this line in between network and charty to get the original
+    [BackgroundControls(), network, chart], #need to add ", get_skeptical_susceptible_ratio" to this line in between network and charty to get the original
     "Virus Model",
     model_params,
 )
+add_tooltip_handler(server, network)
 
 
 
@@ -0,0 +1,78 @@
+import json
+import os
+
+import numpy as np
+
+SNAPSHOT_DIR = 'states'
+
+
+class SnapshotWriter:
+    """Appends the state of every step to a columnar binary store.
+
+    Each step adds one fixed size record to states/codes.bin (int8 State
+    codes) and states/skeptical_level.bin (float32), both laid out as
+    (virus, node), and its step number to states/steps.bin. Records are
+    raw arrays, so SnapshotReader can memory-map them without parsing.
+    """
+
+    def __init__(self, sink, num_virus, num_nodes):
+        self.sink = sink
+        meta = {
+            'num_virus': num_virus,
+            'num_nodes': num_nodes,
+            'codes': 'int8',
+            'skeptical_level': 'float32',
+        }
+        sink.write(f'{SNAPSHOT_DIR}/meta.json', json.dumps(meta))
+
+    def append(self, step, state):
+        self.sink.write_bytes(f'{SNAPSHOT_DIR}/steps.bin', np.int64(step).tobytes())
+        self.sink.write_bytes(f'{SNAPSHOT_DIR}/codes.bin', state.codes.tobytes())
+        self.sink.write_bytes(f'{SNAPSHOT_DIR}/skeptical_level.bin',
+                              state.skeptical_level.astype(np.float32).tobytes())
+
+
+class SnapshotReader:
+    """Lazy access to the snapshots of a run directory.
+
+    Nothing is read up front, step() and node_history() only touch the pages
+    of the memory-mapped files they need. The number of steps comes from the
+    file sizes, so a run that stopped early is still readable.
+    """
+
+    def __init__(self, directory='.'):
+        self.path = os.path.join(directory, SNAPSHOT_DIR)
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.num_virus = meta['num_virus']
+        self.num_nodes = meta['num_nodes']
+        self.steps = self._map('steps.bin', np.dtype(np.int64), ())
+        self.codes = self._map('codes.bin', np.dtype(meta['codes']), (self.num_virus, self.num_nodes))
+        self.skeptical_level = self._map('skeptical_level.bin', np.dtype(meta['skeptical_level']),
+                                         (self.num_virus, self.num_nodes))
+        count = min(len(self.steps), len(self.codes), len(self.skeptical_level))
+        self.steps = self.steps[:count]
+        self.codes = self.codes[:count]
+        self.skeptical_level = self.skeptical_level[:count]
+
+    def _map(self, name, dtype, shape):
+        path = os.path.join(self.path, name)
+        record = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        count = os.path.getsize(path) // record if os.path.exists(path) else 0
+        if count == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,) + shape)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def step(self, step):
+        """(codes, skeptical_level) of one step, each shaped (virus, node)"""
+        row = np.searchsorted(self.steps, step)
+        if row == len(self.steps) or self.steps[row] != step:
+            raise KeyError(f"step {step} is not in {self.path}")
+        return self.codes[row], self.skeptical_level[row]
+
+    def node_history(self, node):
+        """(steps, codes, skeptical_level) of one node, shaped (step, virus)"""
+        return np.array(self.steps), np.array(self.codes[:, :, node]), np.array(self.skeptical_level[:, :, node])
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+
+from .transmission import LOG_NAME
+
+EDGELIST_NAME = 'weighted_edgelist.csv'
+
+
+def _add_counts(counts, values):
+    # bincount into counts, growing it when a larger node shows up
+    if len(values) == 0:
+        return counts
+    add = np.bincount(values, minlength=len(counts))
+    if len(add) > len(counts):
+        add[:len(counts)] += counts
+        return add
+    return counts + add
+
+
+def read_degrees(directory, chunksize=1 << 20):
+    """Degree of every node from the weighted_edgelist.csv of a run"""
+    import pandas as pd
+
+    path = os.path.join(directory, EDGELIST_NAME)
+    degree = np.zeros(0, dtype=np.int64)
+    if not os.path.exists(path):
+        return degree
+    # rows look like "(a, b),weight," and every edge is listed both ways,
+    # so counting sources gives the degree
+    for chunk in pd.read_csv(path, header=None, usecols=[0], dtype=str, chunksize=chunksize):
+        sources = chunk[0].str[1:].astype(np.int64).to_numpy()
+        degree = _add_counts(degree, sources)
+    return degree
+
+
+def count_infections(directory, chunksize=1 << 20):
+    """{virus: infections caused by every node} from the infected_by.csv of a run.
+
+    The log is read chunksize rows at a time, so memory only depends on the
+    number of nodes and not on the length of the log.
+    """
+    import pandas as pd
+
+    counts = {}
+    path = os.path.join(directory, LOG_NAME)
+    dtype = {'step': np.int64, 'source': np.int64, 'target': np.int64, 'virus': np.int64}
+    for chunk in pd.read_csv(path, dtype=dtype, chunksize=chunksize):
+        # the initial outbreak has no source
+        chunk = chunk[chunk['source'] >= 0]
+        for virus, events in chunk.groupby('virus'):
+            counts[virus] = _add_counts(counts.get(virus, np.zeros(0, dtype=np.int64)), events['source'].to_numpy())
+    return dict(sorted(counts.items()))
+
+
+def analyze_run(directory, top_k=10, chunksize=1 << 20):
+    """(per node, top, summary) DataFrames of one run directory.
+
+    per node has a row for every node that infected someone, top the top_k
+    spreaders of each virus and summary one row per virus with the totals
+    and the Pearson and Spearman correlation of degree and infections.
+    """
+    import pandas as pd
+
+    degree = read_degrees(directory, chunksize)
+    nodes, top, summary = [], [], []
+    for virus, counts in count_infections(directory, chunksize).items():
+        size = max(len(counts), len(degree))
+        counts = np.pad(counts, (0, size - len(counts)))
+        node_degree = np.pad(degree, (0, size - len(degree)))
+        spreaders = np.flatnonzero(counts)
+        nodes.append(pd.DataFrame({
+            'virus': virus,
+            'node': spreaders,
+            'degree': node_degree[spreaders],
+            'infections': counts[spreaders],
+        }))
+        # highest count first, ties by node number
+        best = np.lexsort((np.arange(size), -counts))[:min(top_k, len(spreaders))]
+        top.append(pd.DataFrame({
+            'virus': virus,
+            'rank': np.arange(1, len(best) + 1),
+            'node': best,
+            'degree': node_degree[best],
+            'infections': counts[best],
+        }))
+        pair = pd.DataFrame({'degree': node_degree, 'infections': counts})
+        summary.append({
+            'virus': virus,
+            'infections': int(counts.sum()),
+            'spreaders': len(spreaders),
+            'max_infections': int(counts.max()) if size else 0,
+            'pearson': pair['degree'].corr(pair['infections']) if len(degree) else np.nan,
+            'spearman': pair['degree'].corr(pair['infections'], method='spearman') if len(degree) else np.nan,
+        })
+    columns = ['virus', 'node', 'degree', 'infections']
+    return (
+        pd.concat(nodes, ignore_index=True) if nodes else pd.DataFrame(columns=columns),
+        pd.concat(top, ignore_index=True) if top else pd.DataFrame(columns=['virus', 'rank'] + columns[1:]),
+        pd.DataFrame(summary, columns=['virus', 'infections', 'spreaders', 'max_infections', 'pearson', 'spearman']),
+    )
+
+
+def analyze_runs(directories, top_k=10, chunksize=1 << 20):
+    """analyze_run for every directory, merged into three tables with a run column"""
+    import pandas as pd
+
+    tables = ([], [], [])
+    for directory in directories:
+        for table, frame in zip(tables, analyze_run(directory, top_k, chunksize)):
+            frame.insert(0, 'run', os.path.basename(os.path.normpath(directory)))
+            table.append(frame)
+    return tuple(pd.concat(frames, ignore_index=True) for frames in tables)
+
+
+def write_table(frame, path):
+    """Write a DataFrame as Parquet when path ends in .parquet, as CSV otherwise"""
+    if path.endswith('.parquet'):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
@@ -0,0 +1,198 @@
+from collections.abc import MutableMapping
+from enum import IntFlag
+
+import numpy as np
+
+
+class State(IntFlag):
+    """Per virus state code of a node, seeded nodes are INFECTED | EXPOSED"""
+    SUSCEPTIBLE = 0
+    EXPOSED = 1
+    INFECTED = 2
+
+
+# compartment of every State code: susceptible, exposed, infected (with or
+# without the exposed flag)
+SUSCEPTIBLE, EXPOSED, INFECTED = 0, 1, 2
+COMPARTMENT = np.array([SUSCEPTIBLE, EXPOSED, INFECTED, INFECTED], dtype=np.int8)
+
+
+class VirusState:
+    """State of every node for every virus, owned by the model.
+
+    codes holds a State per (virus, node) as int8 and skeptical_level the
+    matching float, so a node costs a few bytes per virus instead of a dict.
+    Constant per virus parameters stay once on model.viruses.
+
+    codes must be changed through set_code/set_codes, which keep a set of
+    the exposed and of the infected nodes of every virus up to date so
+    those queries cost the size of their result instead of a scan over
+    every node. compartments[i][SUSCEPTIBLE] is None, most nodes are
+    susceptible so their set would cost far more than codes. Susceptible
+    nodes come from a scan of codes instead.
+    """
+
+    def __init__(self, num_virus, num_nodes):
+        self.codes = np.zeros((num_virus, num_nodes), dtype=np.int8)
+        self.skeptical_level = np.zeros((num_virus, num_nodes))
+        self.compartments = [(None, set(), set()) for _ in range(num_virus)]
+        # called with (virus, node) after every set_code, e.g. by FrontierActivation
+        self.on_change = None
+
+    def load(self, codes, skeptical_level):
+        """Replace the whole state with copies of the given arrays, e.g. from a Checkpoint"""
+        self.codes = np.array(codes, dtype=np.int8)
+        self.skeptical_level = np.array(skeptical_level, dtype=np.float64)
+        self.compartments = []
+        for row in COMPARTMENT[self.codes]:
+            self.compartments.append((None,) + tuple(set(np.flatnonzero(row == c).tolist())
+                                                     for c in (EXPOSED, INFECTED)))
+
+    def set_code(self, i, node, code):
+        old = COMPARTMENT[self.codes[i, node]]
+        new = COMPARTMENT[code]
+        self.codes[i, node] = code
+        if old != new:
+            if old != SUSCEPTIBLE:
+                self.compartments[i][old].discard(node)
+            if new != SUSCEPTIBLE:
+                self.compartments[i][new].add(node)
+        if self.on_change is not None:
+            self.on_change(i, node)
+
+    def set_codes(self, i, nodes, codes):
+        # nodes must not repeat
+        old = COMPARTMENT[self.codes[i, nodes]]
+        self.codes[i, nodes] = codes
+        new = COMPARTMENT[self.codes[i, nodes]]
+        moved = old != new
+        if moved.any():
+            nodes, old, new = nodes[moved], old[moved], new[moved]
+            for c in (EXPOSED, INFECTED):
+                members = self.compartments[i][c]
+                members.difference_update(nodes[old == c].tolist())
+                members.update(nodes[new == c].tolist())
+
+    def set_flat(self, flat, codes):
+        # set_codes for flat ids virus * num_nodes + node of all viruses at once
+        num_nodes = self.codes.shape[1]
+        if not len(flat):
+            return
+        codes = np.broadcast_to(codes, flat.shape)
+        order = np.argsort(flat, kind='stable')
+        flat, codes = flat[order], codes[order]
+        virus = flat // num_nodes
+        bounds = np.searchsorted(virus, np.arange(len(self.codes) + 1))
+        for i in np.flatnonzero(np.diff(bounds)).tolist():
+            rows = slice(bounds[i], bounds[i + 1])
+            self.set_codes(i, flat[rows] - i * num_nodes, codes[rows])
+
+    def infected(self, i):
+        return (self.codes[i] & State.INFECTED) != 0
+
+    def exposed(self, i):
+        return (self.codes[i] & State.EXPOSED) != 0
+
+    def is_infected(self, i, node):
+        return self.codes[i, node] & State.INFECTED != 0
+
+    def is_exposed(self, i, node):
+        return self.codes[i, node] & State.EXPOSED != 0
+
+    def infected_nodes(self, i):
+        return sorted(self.compartments[i][INFECTED])
+
+    def exposed_nodes(self, i):
+        return sorted(self.compartments[i][EXPOSED])
+
+    def not_infected_or_exposed_nodes(self, i):
+        return np.flatnonzero(self.codes[i] == State.SUSCEPTIBLE).tolist()
+
+
+class AgentMisinformation:
+    """Read/write view that looks like the old per agent misinformation dict.
+
+    agent.misinformation[i]['infected'] still returns 'yes' or 'no', the
+    state keys are served from VirusState and every other key from the
+    shared parameters on the model.
+    """
+
+    __slots__ = ('model', 'node')
+
+    def __init__(self, model, node):
+        self.model = model
+        self.node = node
+
+    def __getitem__(self, i):
+        if i not in self.model.misinformation:
+            raise KeyError(i)
+        return VirusView(self.model, i, self.node)
+
+    def __iter__(self):
+        return iter(self.model.misinformation)
+
+    def __len__(self):
+        return len(self.model.misinformation)
+
+    def __contains__(self, i):
+        return i in self.model.misinformation
+
+    def __repr__(self):
+        return repr({i: dict(self[i]) for i in self})
+
+
+class VirusView(MutableMapping):
+    """One virus of AgentMisinformation"""
+
+    __slots__ = ('model', 'virus', 'node')
+
+    def __init__(self, model, virus, node):
+        self.model = model
+        self.virus = virus
+        self.node = node
+
+    def _keys(self):
+        keys = ['infected', 'exposed'] + list(self.model.misinformation[self.virus])
+        if self.virus == 0:
+            keys.append('infected_list')
+        return keys
+
+    def __getitem__(self, key):
+        state = self.model.state
+        if key == 'infected':
+            return 'yes' if state.is_infected(self.virus, self.node) else 'no'
+        if key == 'exposed':
+            return 'yes' if state.is_exposed(self.virus, self.node) else 'no'
+        if key == 'skeptical_level':
+            return float(state.skeptical_level[self.virus, self.node])
+        if key == 'infected_list' and self.virus == 0:
+            # the old list format, built from the model's TransmissionLog
+            return [
+                virus if source < 0 else ("infected by node:", source, "with virus", virus)
+                for source, virus in zip(*(self.model.transmissions.history(self.node)[k].tolist()
+                                           for k in ('source', 'virus')))
+            ]
+        return self.model.misinformation[self.virus][key]
+
+    def __setitem__(self, key, value):
+        state = self.model.state
+        if key in ('infected', 'exposed'):
+            flag = State.INFECTED if key == 'infected' else State.EXPOSED
+            code = state.codes[self.virus, self.node]
+            state.set_code(self.virus, self.node, code | flag if value == 'yes' else code & ~int(flag))
+        elif key == 'skeptical_level':
+            state.skeptical_level[self.virus, self.node] = value
+        else:
+            raise KeyError(f"{key} is a shared parameter, set it on the model")
+
+    def __delitem__(self, key):
+        raise KeyError(f"{key} can not be removed")
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,111 @@
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .graph_cache import GraphCache
+from .output import FileSystemSink, NullSink
+from .rng import RandomStreams
+
+
+def parameter_grid(fixed_params, variable_params):
+    """Every combination of variable_params, each merged into fixed_params"""
+    names = list(variable_params)
+    return [
+        dict(fixed_params, **dict(zip(names, values)))
+        for values in itertools.product(*(variable_params[name] for name in names))
+    ]
+
+
+def run_one(run_id, params, seed, steps, output_dir, graph_cache=None, streams=None):
+    """Build and run one model, return its summary row"""
+    # the vectorized and events engines need no Mesa, so workers skip importing it
+    if params.get('engine') in ('vectorized', 'events'):
+        from .core import HeadlessVirusOnNetwork as VirusOnNetwork
+    else:
+        from .model import VirusOnNetwork
+
+    start = time.perf_counter()
+    # every run logs to its own directory so parallel runs never share a file
+    output = FileSystemSink(output_dir, streams=streams) if output_dir else NullSink()
+    kwargs = dict(params)
+    graph_seed = kwargs.pop('graph_seed', seed)
+    if graph_cache and kwargs.get('edgelist'):
+        # an edge list file is parsed once and memory-mapped by every run
+        kwargs['graph'], _ = GraphCache(graph_cache).get_edgelist(kwargs['edgelist'], graph_seed)
+    elif graph_cache:
+        # runs with the same graph_seed share one network loaded from disk
+        kwargs['graph'] = GraphCache(graph_cache).get(
+            kwargs.get('num_nodes', 10), kwargs.get('avg_node_degree', 3), graph_seed)
+    model = VirusOnNetwork(seed=seed, output=output, **kwargs)
+    viruses = range(model.num_virus)
+    peak = {i: len(model.infected_nodes(i)) for i in viruses}
+    for _ in range(steps):
+        model.step()
+        for i in viruses:
+            peak[i] = max(peak[i], len(model.infected_nodes(i)))
+    output.close()
+
+    row = {'run': run_id, 'seed': seed, **params, 'steps': steps}
+    for i in viruses:
+        row[f'infected_{i}'] = len(model.infected_nodes(i))
+        row[f'exposed_{i}'] = len(model.exposed_nodes(i))
+        row[f'susceptible_{i}'] = len(model.not_infected_or_exposed_nodes(i))
+        row[f'peak_infected_{i}'] = peak[i]
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+def run_sweep(param_sets, replicates=1, steps=10, processes=None, output_root=None, seed=0,
+              progress=print, graph_cache=None, streams=None):
+    """Run every parameter set replicates times across a process pool.
+
+    param_sets is a list of VirusOnNetwork keyword dicts (see parameter_grid).
+    Each run gets an independent seed spawned from seed and, when output_root
+    is given, its own run directory output_root/run_<n>. Returns a pandas
+    DataFrame with one summary row per run, also written to
+    output_root/results.csv.
+
+    With graph_cache set to a GraphCache directory every run takes its network
+    from the cache, keyed by its graph_seed parameter (the run seed if the
+    parameter set has none), so replicates can share one topology. A
+    parameter set with an edgelist file gets it parsed once and memory-mapped
+    by all its runs. streams limits the run directories to those output
+    streams (see output.Sink).
+    """
+    import pandas as pd
+
+    tasks = [(params, r) for params in param_sets for r in range(replicates)]
+    seeds = RandomStreams(seed).spawn_seeds(len(tasks))
+    rows = []
+    start = time.perf_counter()
+
+    def report():
+        elapsed = time.perf_counter() - start
+        if progress:
+            progress(f"{len(rows)}/{len(tasks)} runs, {len(rows) / elapsed:.2f} runs/s")
+
+    def args(n):
+        output_dir = os.path.join(output_root, f'run_{n:05d}') if output_root else None
+        return n, tasks[n][0], seeds[n], steps, output_dir, graph_cache, streams
+
+    if processes == 1:
+        for n in range(len(tasks)):
+            rows.append(run_one(*args(n)))
+            report()
+    else:
+        # a forked worker would print whatever stdout still buffers again
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(run_one, *args(n)) for n in range(len(tasks))]
+            for future in as_completed(futures):
+                rows.append(future.result())
+                report()
+
+    results = pd.DataFrame(sorted(rows, key=lambda row: row['run']))
+    if output_root:
+        os.makedirs(output_root, exist_ok=True)
+        results.to_csv(os.path.join(output_root, 'results.csv'), index=False)
+    return results
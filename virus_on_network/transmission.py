@@ -0,0 +1,107 @@
+import tempfile
+
+import numpy as np
+
+# one row per infection, source is -1 for the initial outbreak
+EVENT = np.dtype([('step', np.int32), ('source', np.int32), ('target', np.int32), ('virus', np.int8)])
+
+LOG_NAME = 'infected_by.csv'
+LOG_HEADER = 'step,source,target,virus\n'
+# events read back from the spill file per chunk
+CHUNK_EVENTS = 1 << 20
+
+
+class TransmissionLog:
+    """Every infection of a run as (step, source, target, virus) records.
+
+    New events go into a typed array that doubles when full, so an
+    infection costs 13 bytes instead of a tuple in a per node list.
+    spill() moves the events recorded since the last spill out of memory:
+    they are appended to a temporary binary spill file and, if the sink
+    wants it, to infected_by.csv in one chunk. The model calls it once per
+    step, so memory holds at most one step of events. history() and the
+    other queries read the spill file back in chunks of CHUNK_EVENTS.
+    """
+
+    def __init__(self, sink=None, capacity=1024):
+        self.sink = sink
+        self.buffer = np.empty(capacity, dtype=EVENT)
+        # events in buffer, the ones before them are in the spill file
+        self.pending = 0
+        self.spilled = 0
+        self.file = None
+        if sink is not None and sink.wants(LOG_NAME):
+            sink.write(LOG_NAME, LOG_HEADER)
+
+    def __len__(self):
+        return self.spilled + self.pending
+
+    def _reserve(self, extra):
+        if self.pending + extra > len(self.buffer):
+            grown = np.empty(max(2 * len(self.buffer), self.pending + extra), dtype=EVENT)
+            grown[:self.pending] = self.buffer[:self.pending]
+            self.buffer = grown
+
+    def record(self, step, source, target, virus):
+        self._reserve(1)
+        self.buffer[self.pending] = (step, source, target, virus)
+        self.pending += 1
+
+    def record_many(self, step, sources, targets, virus):
+        n = len(targets)
+        self._reserve(n)
+        rows = self.buffer[self.pending:self.pending + n]
+        rows['step'] = step
+        rows['source'] = sources
+        rows['target'] = targets
+        rows['virus'] = virus
+        self.pending += n
+
+    def _append(self, rows):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix='transmissions-')
+        self.file.seek(0, 2)
+        self.file.write(np.ascontiguousarray(rows, dtype=EVENT).tobytes())
+        self.spilled += len(rows)
+
+    def load(self, events):
+        """Start from earlier events, e.g. of a Checkpoint, they count as spilled"""
+        for start in range(0, len(events), CHUNK_EVENTS):
+            self._append(events[start:start + CHUNK_EVENTS])
+
+    def chunks(self):
+        """Every event so far as arrays of up to CHUNK_EVENTS, oldest first"""
+        if self.file is not None:
+            self.file.seek(0)
+            for start in range(0, self.spilled, CHUNK_EVENTS):
+                yield np.fromfile(self.file, dtype=EVENT, count=min(CHUNK_EVENTS, self.spilled - start))
+        if self.pending:
+            yield self.buffer[:self.pending]
+
+    @property
+    def events(self):
+        # every event in one array, e.g. for a Checkpoint
+        return np.concatenate([np.empty(0, dtype=EVENT)] + list(self.chunks()))
+
+    def spill(self):
+        """Move the events recorded since the last spill to the spill file and the sink"""
+        if not self.pending:
+            return
+        rows = self.buffer[:self.pending]
+        if self.sink is not None and self.sink.wants(LOG_NAME):
+            self.sink.write(LOG_NAME, ''.join(
+                f"{s},{a},{b},{v}\n" for s, a, b, v in zip(
+                    rows['step'].tolist(), rows['source'].tolist(), rows['target'].tolist(), rows['virus'].tolist())))
+        self._append(rows)
+        self.pending = 0
+
+    def _select(self, field, node):
+        return np.concatenate([np.empty(0, dtype=EVENT)] + [c[c[field] == node] for c in self.chunks()])
+
+    def history(self, node):
+        """Events in which node got infected, oldest first"""
+        return self._select('target', node)
+
+    def infections_by(self, node):
+        """Events in which node infected another node"""
+        return self._select('source', node)
@@ -0,0 +1,153 @@
+import numpy as np
+
+from .graph import _sorted_unique
+from .state import State
+
+# sub-rounds of a step, see JointKernel.sub_rounds
+SUB_ROUNDS = 16
+
+
+class JointKernel:
+    """The phases of the VirusAgent rules for every virus and node at once.
+
+    Works on flat views of codes and skeptical levels laid out as (virus,
+    site): flat id k * block + site is virus k at site, and site s is node
+    s % num_nodes of copy s // num_nodes of the network. VectorizedEngine
+    has one copy, Ensemble one per replicate. Every phase is one batched
+    operation over all viruses, whose parameters come from a Viruses, and
+    returns the flat ids that change so the caller can keep its own books.
+
+    A step is split into SUB_ROUNDS sub-rounds (see sub_rounds) and every
+    phase only runs for the sites whose turn falls in the sub-round, so a
+    node infected or exposed earlier in a step acts again later in the same
+    step, as under RandomActivation.
+    """
+
+    def __init__(self, graph, viruses, block, rng):
+        self.graph = graph
+        self.viruses = viruses
+        self.block = block
+        self.rng = rng
+        self.num_nodes = graph.num_nodes
+        self.degree = graph.out_degree()
+
+    def neighbors(self, flat):
+        """(edge, source, target) of every out edge of the given flat ids"""
+        nodes = flat % self.num_nodes
+        edges = self.graph.out_edges(nodes)
+        base = np.repeat(flat - nodes, self.degree[nodes])
+        return edges, base + self.graph.sources()[edges], base + self.graph.indices[edges]
+
+    def sub_rounds(self, num_virus):
+        """Flat ids of every virus of the sites of each sub-round of one step.
+
+        Every site gets a uniform random turn in the step like an agent of
+        RandomActivation, turns are rounded down to SUB_ROUNDS sub-rounds.
+        """
+        turn = (self.rng.random(self.block) * SUB_ROUNDS).astype(np.int16)
+        order = np.argsort(turn, kind='stable')
+        bounds = np.searchsorted(turn[order], np.arange(SUB_ROUNDS + 1))
+        offsets = np.arange(num_virus)[:, None] * self.block
+        for k in range(SUB_ROUNDS):
+            yield (offsets + order[bounds[k]:bounds[k + 1]]).ravel()
+
+    def exposures(self, codes, level, flat):
+        # infected nodes among flat expose their susceptible neighbors with
+        # a chance equal to their own skeptical level
+        sources = flat[(codes[flat] & State.INFECTED) != 0]
+        edges, src, dst = self.neighbors(sources)
+        susceptible = codes[dst] == State.SUSCEPTIBLE
+        src, dst = src[susceptible], dst[susceptible]
+        return _sorted_unique(dst[self.rng.random(len(dst)) < level[src]]), len(edges)
+
+    def checks(self, codes, flat):
+        # only infected or exposed nodes can do anything after a check
+        candidates = flat[codes[flat] != 0]
+        frequency = self.viruses.virus_check_frequency[candidates // self.block]
+        return candidates, self.rng.random(len(candidates)) < frequency
+
+    def infections(self, codes, level, sources):
+        """(source, target) flat ids of new infections by sources, sorted by target"""
+        edges, src, dst = self.neighbors(sources)
+        checked = len(edges)
+        exposed = codes[dst] == State.EXPOSED
+        edges, src, dst = edges[exposed], src[exposed], dst[exposed]
+        spread = self.viruses.spread_chance[dst // self.block] * self.graph.weights[edges]
+        hit = (self.rng.random(len(edges)) < spread) & (self.rng.random(len(edges)) > level[src])
+        # a node infected by several neighbors in one step is infected once,
+        # by the first of them in edge order
+        src, dst = src[hit], dst[hit]
+        order = np.argsort(dst, kind='stable')
+        src, dst = src[order], dst[order]
+        first = np.empty(len(dst), dtype=bool)
+        first[:1] = True
+        np.not_equal(dst[1:], dst[:-1], out=first[1:])
+        return src[first], dst[first], checked
+
+    def gain_skeptical(self, nodes, level):
+        # changes level in place, the codes stay as they are
+        chance = self.viruses.gain_skeptical_chance[nodes // self.block]
+        nodes = nodes[self.rng.random(len(nodes)) < chance]
+        current = level[nodes]
+        level[nodes] = np.where(current < .91, current + .10, 1)
+
+
+class VectorizedEngine:
+    """Runs the VirusAgent rules for every node at once on NumPy arrays.
+
+    Works directly on the model's VirusState and a CSRGraph. Each phase of a
+    sub-round (expose, check, infect with suppression of competing viruses,
+    gain skepticism) is one JointKernel operation over every virus and node
+    of the sub-round, so state changes are seen by later sub-rounds of the
+    step like by later agents in RandomActivation, and no virus goes first.
+    """
+
+    def __init__(self, model, graph):
+        self.model = model
+        self.graph = graph
+        self.state = model.state
+        self.rng = model.streams.generator('vectorized')
+        self.kernel = JointKernel(graph, model.viruses, graph.num_nodes, self.rng)
+
+    def get_state(self):
+        return {'rng': self.rng.bit_generator.state}
+
+    def set_state(self, state):
+        self.rng.bit_generator.state = state['rng']
+
+    def step(self):
+        num_virus = len(self.state.codes)
+        for flat in self.kernel.sub_rounds(num_virus):
+            self.sub_round(flat)
+
+    def sub_round(self, flat):
+        profiler = self.model.profiler
+        kernel = self.kernel
+        state = self.state
+        num_nodes = self.graph.num_nodes
+        # (virus * node) views, set_flat keeps the compartments up to date
+        codes = state.codes.reshape(-1)
+        level = state.skeptical_level.reshape(-1)
+        with profiler.phase('expose'):
+            exposed, checked = kernel.exposures(codes, level, flat)
+            state.set_flat(exposed, State.EXPOSED)
+            profiler.count('neighbor_checks', checked)
+            profiler.count('exposures', len(exposed))
+        with profiler.phase('check'):
+            candidates, check = kernel.checks(codes, flat)
+            gaining = candidates[~check & ((codes[candidates] & State.EXPOSED) != 0)]
+            checking = candidates[check]
+            profiler.count('agents_activated', len(candidates))
+        with profiler.phase('infect'):
+            sources = checking[(codes[checking] & State.INFECTED) != 0]
+            sources, targets, checked = kernel.infections(codes, level, sources)
+            state.set_flat(targets, State.INFECTED)
+            self.model.transmissions.record_many(
+                self.model.step_number + 1, sources % num_nodes, targets % num_nodes, targets // num_nodes)
+            profiler.count('neighbor_checks', checked)
+            profiler.count('infections', len(targets))
+            suppressed, levels, cleared = self.model.viruses.suppression_effects(targets, num_nodes, self.rng)
+            level[suppressed] = levels
+            state.set_flat(cleared, codes[cleared] & ~int(State.INFECTED))
+        with profiler.phase('gain_skeptical'):
+            kernel.gain_skeptical(gaining, level)
@@ -0,0 +1,125 @@
+import numpy as np
+
+from .graph import _sorted_unique
+
+# per virus parameters and their defaults, those of VirusOnNetwork
+DEFAULTS = {
+    'initial_outbreak_size': 1,
+    'spread_chance': 1,
+    'exposed_chance': 1,
+    'skeptical_level': 0,
+    'virus_check_frequency': 0.4,
+    'gain_skeptical_chance': 0.5,
+}
+# skeptical level virus 0 and 1 give each other's nodes in the old model
+OPPOSITE_LEVEL = .90
+# viruses the virus_X_* arguments can describe
+LEGACY_VIRUSES = 3
+
+
+class Viruses:
+    """Parameters of any number of viruses as arrays, one entry per virus.
+
+    Every key of DEFAULTS is a float array of length num_virus, e.g.
+    viruses.spread_chance[i]. suppression[i, j] is the skeptical level of
+    virus j that a node gets when virus i infects it, which also takes away
+    its infection with j. 0 means i does not suppress j. The old model is
+    suppression[0, 1] = suppression[1, 0] = .90.
+
+    A node infected by several viruses that suppress each other in the same
+    step ends up with the one that came last in a random order, as if the
+    infections had happened one after the other.
+    """
+
+    def __init__(self, params, suppression=None):
+        num_virus = len(params)
+        for key, default in DEFAULTS.items():
+            setattr(self, key, np.array([p.get(key, default) for p in params], dtype=np.float64))
+        self.initial_outbreak_size = self.initial_outbreak_size.astype(np.int64)
+        if suppression is None:
+            suppression = np.zeros((num_virus, num_virus))
+        self.suppression = np.array(suppression, dtype=np.float64).reshape(num_virus, num_virus)
+        if np.diag(self.suppression).any():
+            raise ValueError("a virus can not suppress itself")
+        # (virus, level) pairs every virus suppresses, for per node code
+        self.suppresses = [
+            [(j, float(self.suppression[i, j])) for j in np.flatnonzero(self.suppression[i]).tolist()]
+            for i in range(num_virus)
+        ]
+
+    def __len__(self):
+        return len(self.suppression)
+
+    @classmethod
+    def legacy(cls, num_virus, **kwargs):
+        """The first num_virus of the three viruses of the virus_X_* arguments, 0 and 1 opposite.
+
+        kwargs may hold any other model parameters, only the virus_X_* ones are read.
+        """
+        num_virus = min(num_virus, LEGACY_VIRUSES)
+        params = [
+            {
+                'initial_outbreak_size': kwargs[f'initial_outbreak_size_virus_{i}'],
+                'spread_chance': kwargs[f'virus_{i}_spread_chance'],
+                'exposed_chance': kwargs[f'exposed_chance_virus_{i}'],
+                'skeptical_level': kwargs[f'skeptical_level_virus_{i}'],
+                'virus_check_frequency': kwargs[f'virus_{i}_check_frequency'],
+                'gain_skeptical_chance': kwargs[f'gain_skeptical_chance_virus_{i}'],
+            }
+            for i in range(num_virus)
+        ]
+        suppression = np.zeros((num_virus, num_virus))
+        if num_virus >= 2:
+            suppression[0, 1] = suppression[1, 0] = OPPOSITE_LEVEL
+        return cls(params, suppression)
+
+    def as_dicts(self):
+        """{virus: {parameter: value}}, the layout of the old model.misinformation.
+
+        opposite_virus is the first virus the virus suppresses (None if it
+        suppresses none) and virus 0 also has num_virus, like the old dicts.
+        """
+        dicts = {}
+        for i in range(len(self)):
+            dicts[i] = {key: getattr(self, key)[i].item() for key in DEFAULTS}
+            suppressed = np.flatnonzero(self.suppression[i])
+            dicts[i]['opposite_virus'] = int(suppressed[0]) if len(suppressed) else None
+        if dicts:
+            dicts[0]['num_virus'] = len(self)
+        return dicts
+
+    def suppression_effects(self, targets, block, rng):
+        """What new infections at flat ids targets do to the other viruses.
+
+        Flat id k * block + site is virus k at site, a node or a (replicate,
+        node) pair. Returns the flat ids whose skeptical level is set, their
+        levels and the flat ids that lose their infection, without repeats.
+        rng orders the infections of one site only when they suppress each
+        other.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        virus = targets // block
+        site = targets - virus * block
+        rows, suppressed = np.nonzero(self.suppression[virus])
+        if not len(rows):
+            return empty, np.empty(0), empty
+        flat = suppressed * block + site[rows]
+        levels = self.suppression[virus[rows], suppressed]
+        clear = np.ones(len(rows), dtype=bool)
+        # a suppressed virus that infected the same site in this step keeps
+        # it if its infection came after the suppressing one
+        order = np.argsort(targets, kind='stable')
+        found = np.searchsorted(targets, flat, sorter=order)
+        found = np.minimum(found, len(targets) - 1)
+        same = targets[order[found]] == flat
+        if same.any():
+            rank = rng.random(len(targets))
+            later = rank[order[found[same]]] > rank[rows[same]]
+            clear[np.flatnonzero(same)[later]] = False
+            # the level written last wins
+            by_rank = np.argsort(rank[rows], kind='stable')
+            flat, levels, rows, clear = flat[by_rank], levels[by_rank], rows[by_rank], clear[by_rank]
+        last = np.ones(len(flat), dtype=bool)
+        ordered = np.argsort(flat, kind='stable')
+        last[ordered[:-1]] = flat[ordered[1:]] != flat[ordered[:-1]]
+        return flat[last], levels[last], _sorted_unique(flat[clear])